@@ -11,7 +11,7 @@
 import os
 import numpy as np
 import networkx as nx
-from hierarchical_confusion_matrix import determineHierarchicalConfusionMatrix, getLeafNode
+from hierarchical_confusion_matrix import determineHierarchicalConfusionMatrix, getLeafNode, createMinimPathsFromLabels
 
 # Methods
 """
@@ -86,15 +86,16 @@ def loadEvaluationData_GermEval2019_Task1B(true_label_file, pred_label_file):
         line = f.readline()
     f.close()    
     # Convert data for hierarchical classification paths
+    root_paths = {}
     for key in true_label_data:
-        minim_paths = createMinimPathsFromLabels(graph, true_label_data[key])
+        minim_paths = createMinimPathsFromLabels(graph, true_label_data[key], root_paths)
         true_labels_corrected = []
         for p in minim_paths:
             true_labels_corrected.append(getLeafNode(p))
         true_label_data[key] = true_labels_corrected
     # Convert data for hierarchical classification paths
     for key in pred_label_data:
-        minim_paths = createMinimPathsFromLabels(graph, pred_label_data[key])
+        minim_paths = createMinimPathsFromLabels(graph, pred_label_data[key], root_paths)
         if(len(minim_paths)==0):
             minim_paths = [["root"]]
         pred_label_data[key] = minim_paths
@@ -114,53 +115,6 @@ def loadEvaluationData_GermEval2019_Task1B(true_label_file, pred_label_file):
     # Return results
     return eval_label_data, n_nopredictions
 
-"""
-This method counts the number of nodes from node_list that appear in a path.
-"""
-def countNodesOnPath(path, node_list):
-    ctr = 0
-    intersect = []
-    for node in node_list:
-        if(node in path):
-            ctr += 1
-            intersect.append(node)
-    return ctr, intersect
-
-"""
-This method creates the minimum length path to a given node from labels in label_data.
-"""
-def createMinimPathsFromLabels(graph, label_data):
-    if(len(label_data)==0):
-        return []
-    selected_nodes = []
-    selected_paths = []
-    remaining_nodes = label_data.copy()
-    remaining_paths = []
-    for val in label_data:
-        for p in nx.all_simple_paths(graph, "root", val):
-            remaining_paths.append(p)
-    while True:
-        # Select path that covers most of remaining nodes
-        max_n = -1
-        s_nodes = []
-        s_path  = []
-        for path in remaining_paths:
-            ctr, nod = countNodesOnPath(path, remaining_nodes)
-            if(ctr>max_n):
-                max_n   = ctr
-                s_nodes = nod.copy()
-                s_path  = path.copy()
-        # Add Path to selected Paths and remove from remaining
-        selected_paths.append(s_path)
-        for n in s_nodes:
-            remaining_nodes.remove(n)
-            selected_nodes.append(n)
-        remaining_paths.remove(s_path)
-        # Break loop if all nodes covered
-        if(len(remaining_nodes)==0):
-            break
-    return selected_paths
-
 
 
 
@@ -0,0 +1 @@
+# Benchmark suite for the hierarchical confusion matrix, run it with "python -m benchmarks"
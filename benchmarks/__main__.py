@@ -0,0 +1,367 @@
+# Benchmark suite for the hierarchical confusion matrix
+# Usage: python -m benchmarks [--suite synthetic scaling casestudies cover startup updates heatmap sampleresults] [--samples N] [--json FILE]
+# (see python -m benchmarks --help for all options)
+
+# Imports
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import time
+import random
+import argparse
+import tracemalloc
+import numpy as np
+from benchmarks import generators, fixtures
+from hierarchical_confusion_matrix import enableProfiling, exportProfilingStatistics, compileHierarchy, aggregatePathEdges
+from hierarchical_confusion_matrix import SampleResultWriter, loadSampleResults, iterateSampleIds, sumSampleResults, diffSampleResults
+from hierarchical_confusion_matrix.SampleResults import SAMPLE_DTYPE
+from benchmarks.engines import SCORING_ENGINES, COVER_ENGINES, scoreReference, scoreCompiled
+
+
+
+
+# Methods
+"""
+This method runs func(*args) once for timing and, if memory is set, once more under tracemalloc for the peak memory.
+It returns the result, the elapsed seconds and the peak memory in bytes (-1 if not measured).
+"""
+def measure(func, args, memory=True):
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    peak = -1
+    if(memory):
+        tracemalloc.start()
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+"""
+This method checks whether the result of an engine equals the result of the reference engine.
+"""
+def isEqualResult(result, reference):
+    if(isinstance(reference, np.ndarray)):
+        return np.array_equal(result, reference)
+    return result == reference
+
+"""
+This method runs all registered engines of one kind on the same input, checks them against the first (reference) engine,
+and returns one report row per engine.
+"""
+def runEngines(engines, suite, scenario, graph, samples, n_samples, memory):
+    rows = []
+    reference = None
+    for name in engines:
+        result, seconds, peak = measure(engines[name], (graph, samples), memory)
+        if(reference is None):
+            reference = result
+        rows.append(createRow(suite, scenario, name, graph.number_of_nodes(), n_samples, seconds, peak, isEqualResult(result, reference)))
+    return rows
+
+"""
+This method creates one report row and prints it to the console.
+"""
+def createRow(suite, scenario, engine, nodes, n_samples, seconds, peak, correct):
+    row = {}
+    row["suite"] = suite
+    row["scenario"] = scenario
+    row["engine"] = engine
+    row["nodes"] = nodes
+    row["samples"] = n_samples
+    row["seconds"] = seconds
+    row["samples_per_s"] = n_samples/seconds if seconds>0 else float("inf")
+    row["peak_kb"] = peak/1024 if peak>=0 else -1
+    row["correct"] = bool(correct)
+    printRow(row)
+    return row
+
+"""
+This method restricts eval_label_data to its first n samples.
+"""
+def limitSamples(eval_label_data, n):
+    keys = list(eval_label_data.keys())[:n]
+    return {key: eval_label_data[key] for key in keys}
+
+"""
+This method runs the scoring engines on a few representative synthetic problems (tree/DAG, SPL/MPL, MLNP/NMLNP).
+"""
+def runSyntheticSuite(n_samples, memory):
+    scenarios = []
+    scenarios.append(("tree_SPL_MLNP", generators.generateTree(4, 4), 1, True))
+    scenarios.append(("tree_MPL_MLNP", generators.generateTree(4, 4), 4, True))
+    scenarios.append(("dag_SPL_MLNP", generators.generateDAG(4, 4, 0.3), 1, True))
+    scenarios.append(("dag_MPL_NMLNP", generators.generateDAG(4, 4, 0.3), 4, False))
+    rows = []
+    for name, graph, multiplicity, mlnp in scenarios:
+        samples = generators.generateLabelSets(graph, n_samples, multiplicity=multiplicity, mlnp=mlnp)
+        rows += runEngines(SCORING_ENGINES, "synthetic", name, graph, samples, n_samples, memory)
+    return rows
+
+"""
+This method runs the scoring engines while varying one parameter of the synthetic problem at a time,
+which gives scaling curves over depth, branching, diamond density and MPL multiplicity.
+"""
+def runScalingSuite(n_samples, memory):
+    rows = []
+    for depth in [2, 3, 4, 5, 6]:
+        graph = generators.generateTree(depth, 3)
+        samples = generators.generateLabelSets(graph, n_samples)
+        rows += runEngines(SCORING_ENGINES, "scaling", "depth="+str(depth), graph, samples, n_samples, memory)
+    for branching in [2, 4, 8, 16]:
+        graph = generators.generateTree(3, branching)
+        samples = generators.generateLabelSets(graph, n_samples)
+        rows += runEngines(SCORING_ENGINES, "scaling", "branching="+str(branching), graph, samples, n_samples, memory)
+    for density in [0.0, 0.25, 0.5, 1.0]:
+        graph = generators.generateDAG(4, 4, density)
+        samples = generators.generateLabelSets(graph, n_samples)
+        rows += runEngines(SCORING_ENGINES, "scaling", "diamond_density="+str(density), graph, samples, n_samples, memory)
+    for multiplicity in [1, 2, 4, 8]:
+        graph = generators.generateDAG(4, 4, 0.3)
+        samples = generators.generateLabelSets(graph, n_samples, multiplicity=multiplicity)
+        rows += runEngines(SCORING_ENGINES, "scaling", "multiplicity="+str(multiplicity), graph, samples, n_samples, memory)
+    return rows
+
+"""
+This method runs the scoring engines on the first submission of each case study shipped in CaseStudies/.
+"""
+def runCaseStudySuite(n_samples, memory):
+    rows = []
+    graph = fixtures.loadGermEvalHierarchy(level=1)
+    for file in fixtures.listGermEvalSubmissions("subtask_a")[:1]:
+        samples = limitSamples(fixtures.loadGermEvalTask1A(graph, file), n_samples)
+        rows += runEngines(SCORING_ENGINES, "casestudies", "GermEval2019_Task1A", graph, samples, len(samples), memory)
+    graph = fixtures.loadGermEvalHierarchy()
+    for file in fixtures.listGermEvalSubmissions("subtask_b")[:1]:
+        samples = limitSamples(fixtures.loadGermEvalTask1B(graph, file), n_samples)
+        rows += runEngines(SCORING_ENGINES, "casestudies", "GermEval2019_Task1B", graph, samples, len(samples), memory)
+    graph = fixtures.generateTransposonStructure()
+    for algo in fixtures.listTransposonAlgorithms()[:1]:
+        samples = limitSamples(fixtures.loadTransposon(graph, algo), n_samples)
+        rows += runEngines(SCORING_ENGINES, "casestudies", "TransposonClassification", graph, samples, len(samples), memory)
+    return rows
+
+"""
+This method runs the path cover engines (label sets to minimal root paths) on GermEval2019 Task1B and on a synthetic DAG.
+"""
+def runCoverSuite(n_samples, memory):
+    rows = []
+    graph = fixtures.loadGermEvalHierarchy()
+    true_labels = fixtures.readGermEvalTrueLabels("subtask_b")
+    label_sets = list(true_labels.values())[:n_samples]
+    rows += runEngines(COVER_ENGINES, "cover", "GermEval2019_Task1B", graph, label_sets, len(label_sets), memory)
+    graph = generators.generateDAG(4, 4, 0.5)
+    samples = generators.generateLabelSets(graph, n_samples, multiplicity=4, mlnp=False)
+    label_sets = [samples[key]["true"] for key in samples]
+    rows += runEngines(COVER_ENGINES, "cover", "dag_MPL_NMLNP", graph, label_sets, len(label_sets), memory)
+    return rows
+
+"""
+This method moves n_updates random nodes of a DAG to a random node of the level above, both in the graph and in a warm
+compiled hierarchy. It compares the incremental update (kept caches) with recompiling, and checks both against the reference.
+"""
+def runUpdateSuite(n_samples, memory, n_updates=20):
+    rows = []
+    rnd = random.Random(0)
+    graph = generators.generateDAG(5, 4, 0.3)
+    hierarchy = compileHierarchy(graph)
+    samples = generators.generateLabelSets(graph, n_samples, multiplicity=2)
+    scoreReference(hierarchy, samples)
+    levels = generators.getLevels(graph)
+    start = time.perf_counter()
+    for i in range(0, n_updates):
+        level = rnd.randint(2, len(levels)-1)
+        node = rnd.choice(levels[level])
+        parent = rnd.choice(levels[level-1])
+        for p in list(graph.predecessors(node)):
+            graph.remove_edge(p, node)
+        graph.add_edge(parent, node)
+        hierarchy.move_node(node, parent)
+    seconds = time.perf_counter() - start
+    rows.append(createRow("updates", "move_node", "incremental_update", graph.number_of_nodes(), n_updates, seconds, -1, True))
+    samples = generators.generateLabelSets(graph, n_samples, multiplicity=2, seed=1)
+    engines = {}
+    engines["reference"] = scoreReference
+    engines["recompiled"] = scoreCompiled
+    engines["incremental"] = lambda graph, samples: scoreReference(hierarchy, samples)
+    rows += runEngines(engines, "updates", "score_after_updates", graph, samples, n_samples, memory)
+    return rows
+
+"""
+This method aggregates the compared paths of all samples (see aggregatePathEdges) and checks them against the summed
+hierarchical confusion matrices: the common edges must equal TP, and the error edges plus the skipped unknown edges must equal FP + FN.
+"""
+def checkAggregate(suite, scenario, graph, samples, memory):
+    total = scoreReference(graph, samples).sum(axis=0)
+    items = [(key, samples[key]["true"], samples[key]["pred"]) for key in samples]
+    aggregate, seconds, peak = measure(aggregatePathEdges, (graph, items), memory)
+    correct = aggregate["common"].sum()==total[0] and aggregate["errors"].sum()+aggregate["unknown_edges"]==total[2]+total[3]
+    return createRow(suite, scenario, "aggregatePathEdges", graph.number_of_nodes(), len(samples), seconds, peak, correct)
+
+"""
+This method checks the edge aggregation of the error heatmaps against the scorer on synthetic problems, on predictions
+with edges that are not in the hierarchy, and on GermEval2019 Task1B.
+"""
+def runHeatmapSuite(n_samples, memory):
+    rows = []
+    graph = generators.generateTree(4, 4)
+    rows.append(checkAggregate("heatmap", "tree_SPL_MLNP", graph, generators.generateLabelSets(graph, n_samples), memory))
+    graph = generators.generateDAG(4, 4, 0.5)
+    samples = generators.generateLabelSets(graph, n_samples, multiplicity=4, mlnp=False)
+    rows.append(checkAggregate("heatmap", "dag_MPL_NMLNP", graph, samples, memory))
+    for key in samples:
+        samples[key]["pred"] = [path+["unknown"] for path in samples[key]["pred"]]
+    rows.append(checkAggregate("heatmap", "unknown_edges", graph, samples, memory))
+    graph = fixtures.loadGermEvalHierarchy()
+    file = fixtures.listGermEvalSubmissions("subtask_b")[0]
+    rows.append(checkAggregate("heatmap", "GermEval2019_Task1B", graph, limitSamples(fixtures.loadGermEvalTask1B(graph, file), n_samples), memory))
+    return rows
+
+"""
+This method writes per-sample results like an interrupted evaluation that is continued: the first half of the samples is written,
+then the writer stops without writing its buffer and with ids of an unfinished chunk left behind, and a new writer continues the file.
+It returns the memory-mapped results.
+"""
+def writeInterruptedResults(file, keys, matrices, chunk_size):
+    half = len(keys)//2
+    writer = SampleResultWriter(file, chunk_size=chunk_size, overwrite=True)
+    writer.appendMany(keys[:half], matrices[:half])
+    writer.ids_file.write("unfinished\n"*3)
+    writer.ids_file.close()
+    writer.f.close()
+    writer = SampleResultWriter(file, chunk_size=chunk_size)
+    writer.appendMany(keys[writer.n_rows:], matrices[writer.n_rows:])
+    writer.close()
+    return loadSampleResults(file)
+
+"""
+This method checks that a result file with SAMPLE_DTYPE rows can only be continued if it was written by SampleResultWriter
+(and with the same write_ids).
+"""
+def isContinuationRefused(file, write_ids_before, write_ids_after, save=False):
+    if(save):
+        np.save(file, np.zeros(3, dtype=SAMPLE_DTYPE))
+    else:
+        writer = SampleResultWriter(file, chunk_size=2, write_ids=write_ids_before, overwrite=True)
+        writer.appendMany(["a", "b", "c"], np.ones((3, 4)))
+        writer.close()
+    try:
+        SampleResultWriter(file, write_ids=write_ids_after).close()
+    except ValueError:
+        return True
+    return False
+
+"""
+This method writes the per-sample results of synthetic samples with an interruption and continuation, and checks the
+memory-mapped file against the scores (rows, sample ids, sums), as well as the refused continuations.
+"""
+def runSampleResultSuite(n_samples, memory):
+    folder = tempfile.mkdtemp()
+    file = os.path.join(folder, "results.npy")
+    graph = generators.generateDAG(4, 4, 0.3)
+    samples = generators.generateLabelSets(graph, n_samples, multiplicity=2)
+    matrices = scoreCompiled(graph, samples)
+    keys = ["sample_"+str(key) for key in samples]
+    results, seconds, peak = measure(writeInterruptedResults, (file, keys, matrices, 64), memory)
+    expected = np.zeros(len(keys), dtype=SAMPLE_DTYPE)
+    expected["id"] = np.arange(len(keys))
+    for j, name in enumerate(["TP", "TN", "FP", "FN"]):
+        expected[name] = matrices[:,j]
+    correct = len(results)==len(keys) and np.array_equal(results["id"], expected["id"]) and len(diffSampleResults(results, expected, chunk_size=100))==0
+    correct = correct and list(iterateSampleIds(file))==keys and np.array_equal(sumSampleResults(results, chunk_size=100), matrices.sum(axis=0))
+    del results
+    refused = isContinuationRefused(file, True, True, save=True) and isContinuationRefused(file, False, True) and isContinuationRefused(file, True, False)
+    rows = [createRow("sampleresults", "interrupt_and_continue", "SampleResultWriter", graph.number_of_nodes(), len(keys), seconds, peak, correct)]
+    rows.append(createRow("sampleresults", "refused_continuations", "SampleResultWriter", 0, 3, 1.0, -1, refused))
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    os.rmdir(folder)
+    return rows
+
+"""
+This method measures in fresh interpreters (best of repeats) the time a python statement needs, after "import numpy" as baseline,
+and whether it imports networkx or matplotlib.
+"""
+def measureStartup(statement, repeats=5):
+    code = "import sys, time\nimport numpy\nt = time.perf_counter()\n"+statement+"\n"
+    code += "print(time.perf_counter()-t, 'networkx' in sys.modules or 'matplotlib' in sys.modules)"
+    best = float("inf")
+    heavy = False
+    for i in range(0, repeats):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+        best = min(best, float(out[0]))
+        heavy = heavy or out[1]=="True"
+    return best, heavy
+
+"""
+This method checks the startup cost of short-lived worker processes: importing the package, and loading plus scoring
+a compiled hierarchy, must neither import networkx/matplotlib nor take longer than bound seconds (beyond numpy).
+"""
+def runStartupSuite(n_samples, memory, bound=0.1):
+    rows = []
+    folder = tempfile.mkdtemp()
+    file = os.path.join(folder, "hierarchy.pickle")
+    compileHierarchy(generators.generateTree(4, 4)).save(file)
+    statements = {}
+    statements["import"] = "import hierarchical_confusion_matrix"
+    statements["load_and_score"] = "import hierarchical_confusion_matrix as hcm\nh = hcm.loadCompiledHierarchy("+repr(file)+")\nhcm.determineHierarchicalConfusionMatrix(h, ['1/1/1/1'], [['root','1','1/2']])"
+    for name in statements:
+        seconds, heavy = measureStartup(statements[name])
+        rows.append(createRow("startup", name, "subprocess", 0, 1, seconds, -1, (not heavy) and seconds <= bound))
+    os.remove(file)
+    os.rmdir(folder)
+    return rows
+
+"""
+This method prints one report row to the console.
+"""
+def printRow(row):
+    print(row["suite"], "\t", row["scenario"], "\t", row["engine"], "\t", row["nodes"], "\t", row["samples"], "\t",
+          "%.1f" % row["samples_per_s"], "\t", "%.1f" % row["peak_kb"], "\t", "OK" if row["correct"] else "MISMATCH")
+    sys.stdout.flush()
+
+
+
+
+SUITES = {
+    "synthetic": runSyntheticSuite,
+    "scaling": runScalingSuite,
+    "casestudies": runCaseStudySuite,
+    "cover": runCoverSuite,
+    "startup": runStartupSuite,
+    "updates": runUpdateSuite,
+    "heatmap": runHeatmapSuite,
+    "sampleresults": runSampleResultSuite,
+}
+
+"""
+This method parses the command line arguments, runs the selected suites and returns 1 if any engine disagrees with its reference.
+"""
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks for the hierarchical confusion matrix.")
+    parser.add_argument("--suite", nargs="+", choices=list(SUITES.keys()), default=list(SUITES.keys()), help="suites to run (default: all)")
+    parser.add_argument("--samples", type=int, default=1000, help="number of samples per scenario (default: 1000)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run for peak memory")
+    parser.add_argument("--json", default="", help="write all report rows to this JSON file")
+    parser.add_argument("--profile", default="", help="record stage statistics and write them to this JSON file")
+    args = parser.parse_args(argv)
+    if(args.profile!=""):
+        enableProfiling()
+    print("suite\tscenario\tengine\tnodes\tsamples\tsamples/s\tpeak_kb\tcheck")
+    rows = []
+    for suite in args.suite:
+        rows += SUITES[suite](args.samples, not args.no_memory)
+    if(args.json!=""):
+        f = open(args.json, "w")
+        json.dump(rows, f, indent=1)
+        f.close()
+    if(args.profile!=""):
+        exportProfilingStatistics(args.profile)
+    if(not all(row["correct"] for row in rows)):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# Imports
+import networkx as nx
+import numpy as np
+from hierarchical_confusion_matrix import determineHierarchicalConfusionMatrix, createMinimPathsFromLabels, compileHierarchy
+from hierarchical_confusion_matrix.AsyncEvaluation import evaluateSamplesAsync
+
+
+
+
+# Methods
+"""
+This method scores all samples of eval_label_data with the reference implementation determineHierarchicalConfusionMatrix.
+It returns an array with one row (TP, TN, FP, FN) per sample.
+"""
+def scoreReference(graph, eval_label_data):
+    results = []
+    for key in eval_label_data:
+        results.append(determineHierarchicalConfusionMatrix(graph, eval_label_data[key]["true"], eval_label_data[key]["pred"]))
+    return np.asarray(results).reshape(-1, 4)
+
+"""
+This method compiles the hierarchy once and scores all samples of eval_label_data on the compiled hierarchy.
+"""
+def scoreCompiled(graph, eval_label_data):
+    return scoreReference(compileHierarchy(graph), eval_label_data)
+
+"""
+This method scores all samples of eval_label_data on a compiled hierarchy through the asyncio micro-batching evaluator.
+"""
+def scoreAsync(graph, eval_label_data):
+    samples = [(key, eval_label_data[key]["true"], eval_label_data[key]["pred"]) for key in eval_label_data]
+    results, snapshot = evaluateSamplesAsync(compileHierarchy(graph), samples, max_batch_size=256)
+    return np.asarray(results).reshape(-1, 4)
+
+"""
+This method converts all label sets with the original greedy path cover of Example_GermEval2019_Task1B.py,
+which rescans all remaining paths on each iteration. It is kept as reference for the library version.
+"""
+def coverReference(graph, label_sets):
+    results = []
+    for label_data in label_sets:
+        if(len(label_data)==0):
+            results.append([])
+            continue
+        selected_paths = []
+        remaining_nodes = label_data.copy()
+        remaining_paths = []
+        for val in label_data:
+            for p in nx.all_simple_paths(graph, "root", val):
+                remaining_paths.append(p)
+        while len(remaining_nodes)!=0:
+            max_n = -1
+            s_nodes = []
+            s_path  = []
+            for path in remaining_paths:
+                nod = [node for node in remaining_nodes if node in path]
+                if(len(nod)>max_n):
+                    max_n   = len(nod)
+                    s_nodes = nod
+                    s_path  = path.copy()
+            selected_paths.append(s_path)
+            for n in s_nodes:
+                remaining_nodes.remove(n)
+            remaining_paths.remove(s_path)
+        results.append(selected_paths)
+    return results
+
+"""
+This method converts all label sets with the library path cover createMinimPathsFromLabels, sharing one root path cache.
+"""
+def coverLibrary(graph, label_sets):
+    root_paths = {}
+    return [createMinimPathsFromLabels(graph, label_data, root_paths) for label_data in label_sets]
+
+"""
+This method converts all label sets with the library path cover on a compiled hierarchy.
+"""
+def coverCompiled(graph, label_sets):
+    return coverLibrary(compileHierarchy(graph), label_sets)
+
+
+
+
+# Registered engines, the first one of each kind is the reference the others are checked against
+SCORING_ENGINES = {
+    "reference": scoreReference,
+    "compiled": scoreCompiled,
+    "async": scoreAsync,
+}
+COVER_ENGINES = {
+    "reference": coverReference,
+    "library": coverLibrary,
+    "compiled": coverCompiled,
+}
@@ -0,0 +1,91 @@
+# Imports
+import os
+import networkx as nx
+from hierarchical_confusion_matrix import Loaders
+
+
+
+
+# Methods
+"""
+This method returns the path of the CaseStudies folder shipped with the repository.
+"""
+def getCaseStudiesPath():
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CaseStudies")
+
+"""
+This method loads the GermEval2019 hierarchy as a graph object (see Example_GermEval2019_Task1A.py).
+With level=1 only the first level of the hierarchy is kept.
+"""
+def loadGermEvalHierarchy(level=-1):
+    return Loaders.loadHierarchyFromEdgeList(os.path.join(getCaseStudiesPath(), "GermEval2019", "hierarchy.txt"), level)
+
+"""
+This method lists the GermEval2019 submission files that contain results for a given subtask ("subtask_a" or "subtask_b").
+"""
+def listGermEvalSubmissions(subtask):
+    folder = os.path.join(getCaseStudiesPath(), "GermEval2019", "system-submissions", "test-phase-txt")
+    files = []
+    for algo in sorted(os.listdir(folder)):
+        f = open(os.path.join(folder, algo), "r", encoding="utf8")
+        lines = f.read().split("\n")
+        f.close()
+        if(subtask in lines):
+            files.append(os.path.join(folder, algo))
+    return files
+
+"""
+This method reads the true label sets of one subtask of GermEval2019 as a dict id -> list of labels.
+"""
+def readGermEvalTrueLabels(subtask):
+    return Loaders.readGermEvalLabels(os.path.join(getCaseStudiesPath(), "GermEval2019", "blurbs_test_label.txt"), subtask)
+
+"""
+This method converts a list of (id, true labels, prediction paths) to the eval_label_data dict of the example scripts.
+"""
+def toEvalLabelData(samples):
+    eval_label_data = {}
+    for key, true_labels, pred_paths in samples:
+        eval_label_data[key] = {}
+        eval_label_data[key]["true"] = true_labels
+        eval_label_data[key]["pred"] = pred_paths
+    return eval_label_data
+
+"""
+This method loads the evaluation data of GermEval2019 Task1A (see Example_GermEval2019_Task1A.py).
+Empty labels from trailing tabs are dropped, and samples without any prediction get the path ["root"] as in Task1B.
+"""
+def loadGermEvalTask1A(graph, pred_label_file):
+    true_label_file = os.path.join(getCaseStudiesPath(), "GermEval2019", "blurbs_test_label.txt")
+    return toEvalLabelData(Loaders.loadEvaluationData_GermEval(graph, true_label_file, pred_label_file, "a"))
+
+"""
+This method loads the evaluation data of GermEval2019 Task1B (see Example_GermEval2019_Task1B.py).
+"""
+def loadGermEvalTask1B(graph, pred_label_file):
+    true_label_file = os.path.join(getCaseStudiesPath(), "GermEval2019", "blurbs_test_label.txt")
+    return toEvalLabelData(Loaders.loadEvaluationData_GermEval(graph, true_label_file, pred_label_file, "b"))
+
+"""
+This method generates the transposon classification taxonomy (see Example_TransposonClassification.py).
+The nodes are added in the column order of the probability files.
+"""
+def generateTransposonStructure():
+    classes = ["1","1/1","1/1/1","1/1/2","1/1/3","1/2","1/2/1","1/2/2","2","2/1","2/1/1","2/1/2","2/1/3","2/1/4","2/1/5","2/1/6","2/2","2/3"]
+    graph = nx.DiGraph()
+    for c in classes:
+        graph.add_edge("root" if "/" not in c else c[:c.rindex("/")], c)
+    return graph
+
+"""
+This method lists the classifiers of the transposon classification case study.
+"""
+def listTransposonAlgorithms():
+    return sorted(os.listdir(os.path.join(getCaseStudiesPath(), "TransposonClassification")))
+
+"""
+This method loads the evaluation data of one transposon classifier (see Example_TransposonClassification.py).
+"""
+def loadTransposon(graph, algo):
+    folder = os.path.join(getCaseStudiesPath(), "TransposonClassification", algo, "ALL_small", "inference10")
+    return toEvalLabelData(Loaders.loadEvaluationData_Transposon(graph, os.path.join(folder, "truelabels.txt"), os.path.join(folder, "predictions.txt")))
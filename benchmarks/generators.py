@@ -0,0 +1,104 @@
+# Imports
+import random
+import networkx as nx
+
+
+
+
+# Methods
+"""
+This method generates a synthetic tree hierarchy with a given depth and branching factor.
+Node labels encode their position, e.g. "2/1/3" is the third child of "2/1".
+"""
+def generateTree(depth, branching):
+    graph = nx.DiGraph()
+    graph.add_node("root")
+    level = ["root"]
+    for d in range(0, depth):
+        next_level = []
+        for parent in level:
+            for b in range(1, branching+1):
+                child = str(b) if parent=="root" else parent+"/"+str(b)
+                graph.add_edge(parent, child)
+                next_level.append(child)
+        level = next_level
+    return graph
+
+"""
+This method generates a synthetic DAG hierarchy by adding extra parents to the nodes of a tree.
+Every node below the first level receives an additional parent from the level above with probability diamond_density,
+which creates diamonds (several root paths to the same node).
+"""
+def generateDAG(depth, branching, diamond_density, seed=0):
+    rnd = random.Random(seed)
+    graph = generateTree(depth, branching)
+    levels = getLevels(graph)
+    for l in range(2, len(levels)):
+        for node in levels[l]:
+            if(rnd.random() < diamond_density):
+                parent = rnd.choice(levels[l-1])
+                graph.add_edge(parent, node)
+    return graph
+
+"""
+This method returns the nodes of a generated hierarchy grouped by their (shortest) level, root being level 0.
+"""
+def getLevels(graph):
+    depth = nx.single_source_shortest_path_length(graph, "root")
+    levels = [[] for _ in range(0, max(depth.values())+1)]
+    for node in graph.nodes:
+        levels[depth[node]].append(node)
+    for level in levels:
+        level.sort()
+    return levels
+
+"""
+This method draws a random path from "root" to a given node by walking up random predecessors.
+"""
+def randomRootPath(graph, node, rnd):
+    path = [node]
+    while node != "root":
+        node = rnd.choice(list(graph.predecessors(node)))
+        path.append(node)
+    path.reverse()
+    return path
+
+"""
+This method extends a given path by a random walk down the hierarchy, stopping at a leaf (MLNP)
+or with probability stop_prob at every node (NMLNP).
+"""
+def randomWalkDown(graph, path, rnd, stop_prob=0.0):
+    path = path.copy()
+    while True:
+        children = list(graph.successors(path[-1]))
+        if(len(children)==0 or (len(path)>1 and rnd.random()<stop_prob)):
+            return path
+        path.append(rnd.choice(children))
+
+"""
+This method generates synthetic evaluation samples (true labels and prediction paths) for a hierarchy.
+Every sample has between 1 and multiplicity true labels (MPL), and the same number of prediction paths.
+Each prediction path follows a true path and diverges from it at a random depth with probability noise.
+With mlnp=False, labels and predictions may stop at inner nodes (NMLNP).
+The result has the same format as the eval_label_data of the example scripts.
+"""
+def generateLabelSets(graph, n_samples, multiplicity=1, noise=0.5, mlnp=True, seed=0):
+    rnd = random.Random(seed)
+    stop_prob = 0.0 if mlnp else 0.3
+    eval_label_data = {}
+    for key in range(0, n_samples):
+        true_labels = []
+        pred_paths = []
+        for i in range(0, rnd.randint(1, multiplicity)):
+            true_path = randomWalkDown(graph, ["root"], rnd, stop_prob)
+            if(true_path[-1] in true_labels):
+                continue
+            true_labels.append(true_path[-1])
+            pred_path = randomRootPath(graph, true_path[-1], rnd)
+            if(rnd.random() < noise):
+                pred_path = randomWalkDown(graph, pred_path[:rnd.randint(1, len(pred_path))], rnd, stop_prob)
+            pred_paths.append(pred_path)
+        eval_label_data[key] = {}
+        eval_label_data[key]["true"] = true_labels
+        eval_label_data[key]["pred"] = pred_paths
+    return eval_label_data
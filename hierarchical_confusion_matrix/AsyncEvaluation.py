@@ -0,0 +1,291 @@
+# Asynchronous evaluation service for online monitoring of the hierarchical confusion matrix
+
+# Imports
+import copy
+import time
+import asyncio
+import collections
+import concurrent.futures
+import numpy as np
+from .HierarchicalConfusion import determineHierarchicalConfusionMatrix, determineEvaluationMeasures
+
+
+
+
+# Compiled hierarchy of a worker process, set by initWorker
+worker_hierarchy = None
+
+
+
+
+# Methods
+"""
+This method scores a batch of (true labels, prediction paths) and returns one result per sample,
+which is the hierarchical confusion matrix or the exception raised for that sample.
+"""
+def scoreBatch(hierarchy, batch):
+    results = []
+    for true_labels, pred_paths in batch:
+        try:
+            results.append(determineHierarchicalConfusionMatrix(hierarchy, true_labels, pred_paths))
+        except Exception as e:
+            results.append(e)
+    return results
+
+"""
+This method initializes a worker process with the hierarchy.
+"""
+def initWorker(hierarchy):
+    global worker_hierarchy
+    worker_hierarchy = hierarchy
+
+"""
+This method scores a batch in a worker process, it returns the version of the worker's hierarchy and the results.
+"""
+def scoreBatchInWorker(batch):
+    return getattr(worker_hierarchy, "version", 0), scoreBatch(worker_hierarchy, batch)
+
+"""
+This method scores a list of samples (id, true labels, prediction paths) with an AsyncEvaluator through a LocalClient.
+It returns the list of results and the final snapshot. Keyword arguments are passed to AsyncEvaluator.
+"""
+def evaluateSamplesAsync(hierarchy, samples, **kwargs):
+    async def run():
+        async with AsyncEvaluator(hierarchy, **kwargs) as evaluator:
+            results = await LocalClient(evaluator).evaluateMany(samples)
+        return results, evaluator.snapshots[-1]
+    return asyncio.run(run())
+
+
+
+
+# Classes
+"""
+This class scores (true labels, prediction paths) submissions asynchronously.
+Submissions are collected into micro-batches of at most max_batch_size samples, or whatever arrived within max_delay seconds
+after the first one, and every batch is scored on a thread pool (executor="thread") or process pool (executor="process")
+with the given number of workers, or on a given concurrent.futures.Executor.
+Each submission resolves to its own confusion matrix, while a running total of all submissions is kept,
+and with snapshot_interval > 0 a snapshot of the total is taken periodically (kept in snapshots, and passed to on_snapshot).
+Use it as "async with AsyncEvaluator(hierarchy) as evaluator:" or call start() and stop().
+Changes of a compiled hierarchy should be applied after flush(). Process workers get a copy of the hierarchy,
+the process pool is restarted when the version of the hierarchy changes. Snapshots report the hierarchy versions
+the counted samples were scored with.
+"""
+class AsyncEvaluator:
+    def __init__(self, hierarchy, max_batch_size=64, max_delay=0.005, executor="thread", workers=1,
+                 snapshot_interval=0, on_snapshot=None, max_snapshots=100):
+        self.hierarchy = hierarchy
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.executor = executor
+        self.workers = workers
+        self.snapshot_interval = snapshot_interval
+        self.on_snapshot = on_snapshot
+        self.snapshots = collections.deque(maxlen=max_snapshots)
+        self.total = np.zeros(4, dtype=np.int64)
+        self.n_samples = 0
+        self.n_errors = 0
+        self.n_batches = 0
+        self.version_samples = {}
+        self.running = False
+        self.queue = None
+        self.slots = None
+        self.pool = None
+        self.pool_version = None
+        self.batcher = None
+        self.snapshotter = None
+        self.batch_tasks = set()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    """
+    This method starts the batching (and snapshot) tasks and the worker pool.
+    """
+    async def start(self):
+        if(self.running):
+            raise RuntimeError("AsyncEvaluator is already running")
+        self.running = True
+        self.queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(2*self.workers)
+        if(self.executor=="thread"):
+            self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+        elif(self.executor=="process"):
+            self.startProcessPool()
+        else:
+            self.pool = self.executor
+        self.batcher = asyncio.create_task(self.runBatcher())
+        if(self.snapshot_interval > 0):
+            self.snapshotter = asyncio.create_task(self.runSnapshots())
+
+    """
+    This method scores all pending submissions, stops the tasks and the worker pool, and returns a final snapshot.
+    Submissions made after stop() raise a RuntimeError, items still queued behind the end of the queue are failed with it.
+    """
+    async def stop(self):
+        if(not self.running):
+            return self.takeSnapshot()
+        self.running = False
+        await self.queue.put(None)
+        await self.batcher
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if(item is not None and not item[2].done()):
+                item[2].set_exception(RuntimeError("AsyncEvaluator was stopped before the submission was scored"))
+            self.queue.task_done()
+        if(len(self.batch_tasks)!=0):
+            await asyncio.gather(*self.batch_tasks)
+        if(self.snapshotter is not None):
+            self.snapshotter.cancel()
+            try:
+                await self.snapshotter
+            except asyncio.CancelledError:
+                pass
+        if(self.executor in ["thread", "process"]):
+            self.pool.shutdown()
+        return self.takeSnapshot()
+
+    """
+    This method starts a process pool whose workers get a copy of the current hierarchy.
+    A previous pool finishes its running batches and is shut down.
+    """
+    def startProcessPool(self):
+        if(self.pool is not None):
+            self.pool.shutdown(wait=False)
+        self.pool_version = getattr(self.hierarchy, "version", 0)
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers, initializer=initWorker, initargs=(copy.deepcopy(self.hierarchy),))
+
+    """
+    This method waits until all submissions made so far are scored.
+    """
+    async def flush(self):
+        await self.queue.join()
+
+    """
+    This method submits one sample and returns its hierarchical confusion matrix (TP, TN, FP, FN) once it is scored.
+    It raises a RuntimeError if the evaluator is not running (before start() or after stop()).
+    """
+    async def submit(self, true_labels, pred_paths):
+        if(not self.running):
+            raise RuntimeError("AsyncEvaluator is not running (start() was not called or stop() was called)")
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((true_labels, pred_paths, future))
+        return await future
+
+    """
+    This method collects the queued submissions into batches and starts scoring them.
+    """
+    async def runBatcher(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self.queue.get()
+            if(item is None):
+                self.queue.task_done()
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if(timeout <= 0):
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if(item is None):
+                    self.queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+            await self.slots.acquire()
+            task = asyncio.create_task(self.processBatch(batch))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    """
+    This method scores one batch on the worker pool, resolves the futures of its submissions and updates the running total.
+    """
+    async def processBatch(self, batch):
+        loop = asyncio.get_running_loop()
+        samples = [(true_labels, pred_paths) for true_labels, pred_paths, future in batch]
+        version = getattr(self.hierarchy, "version", 0)
+        try:
+            if(self.executor=="process"):
+                if(version!=self.pool_version):
+                    self.startProcessPool()
+                version, results = await loop.run_in_executor(self.pool, scoreBatchInWorker, samples)
+            else:
+                results = await loop.run_in_executor(self.pool, scoreBatch, self.hierarchy, samples)
+        except Exception as e:
+            results = [e]*len(batch)
+        finally:
+            self.slots.release()
+        self.n_batches += 1
+        for (true_labels, pred_paths, future), result in zip(batch, results):
+            if(isinstance(result, Exception)):
+                self.n_errors += 1
+                if(not future.done()):
+                    future.set_exception(result)
+            else:
+                self.total += np.asarray(result, dtype=np.int64)
+                self.n_samples += 1
+                self.version_samples[version] = self.version_samples.get(version, 0) + 1
+                if(not future.done()):
+                    future.set_result(result)
+            self.queue.task_done()
+
+    """
+    This method takes a snapshot every snapshot_interval seconds.
+    """
+    async def runSnapshots(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            self.takeSnapshot()
+
+    """
+    This method returns a snapshot of the running total with evaluation measures, stores it in snapshots and passes it to on_snapshot.
+    "hierarchy_versions" holds the number of samples scored with each version of the hierarchy,
+    "hierarchy_version" the newest of these versions (None before the first sample).
+    """
+    def takeSnapshot(self):
+        snapshot = {}
+        snapshot["time"] = time.time()
+        snapshot["samples"] = self.n_samples
+        snapshot["errors"] = self.n_errors
+        snapshot["batches"] = self.n_batches
+        snapshot["hierarchy_version"] = max(self.version_samples) if len(self.version_samples)!=0 else None
+        snapshot["hierarchy_versions"] = dict(self.version_samples)
+        snapshot["TP"] = int(self.total[0])
+        snapshot["TN"] = int(self.total[1])
+        snapshot["FP"] = int(self.total[2])
+        snapshot["FN"] = int(self.total[3])
+        snapshot.update(determineEvaluationMeasures(self.total))
+        self.snapshots.append(snapshot)
+        if(self.on_snapshot is not None):
+            self.on_snapshot(snapshot)
+        return snapshot
+
+"""
+This class is an in-process client of an AsyncEvaluator, e.g. for tests or for scoring a list of samples.
+"""
+class LocalClient:
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+
+    """
+    This method scores one sample and returns its hierarchical confusion matrix.
+    """
+    async def evaluate(self, true_labels, pred_paths):
+        return await self.evaluator.submit(true_labels, pred_paths)
+
+    """
+    This method submits many samples (id, true labels, prediction paths) concurrently and returns their results in order.
+    """
+    async def evaluateMany(self, samples):
+        return await asyncio.gather(*[self.evaluate(true_labels, pred_paths) for key, true_labels, pred_paths in samples])
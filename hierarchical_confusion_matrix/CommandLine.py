@@ -0,0 +1,291 @@
+# Command line interface for the hierarchical confusion matrix
+# Usage: hcm evaluate --hierarchy FILE --truth FILE --pred FILE [FILE ...] --format germeval|transposon|binary
+
+# Imports
+import os
+import io
+import sys
+import csv
+import json
+import hashlib
+import argparse
+import itertools
+import collections
+import concurrent.futures
+import numpy as np
+from .HierarchicalConfusion import determineHierarchicalConfusionMatrix, determineEvaluationMeasures
+from .CompiledHierarchy import compileHierarchy, loadCompiledHierarchy
+from .SampleResults import SampleResultWriter
+from . import Loaders
+from . import Profiling
+
+
+
+
+# Version of the compiled hierarchy cache files, increase when CompiledHierarchy changes
+CACHE_VERSION = "3"
+# Compiled hierarchy of a worker process, set by initWorker
+worker_hierarchy = None
+
+
+
+
+# Methods
+"""
+This method loads and compiles a hierarchy file. If cache_dir is given, the compiled hierarchy is stored there
+(keyed by the file content and level) and reused by later invocations.
+It returns the compiled hierarchy and the cache file ("" without cache).
+"""
+def loadHierarchy(file, level, cache_dir=""):
+    cache_file = ""
+    if(cache_dir!=""):
+        f = open(file, "rb")
+        digest = hashlib.sha256(f.read()+("|"+str(level)+"|"+CACHE_VERSION).encode("utf8")).hexdigest()
+        f.close()
+        cache_file = os.path.join(cache_dir, "hierarchy_"+digest+".pickle")
+        if(os.path.exists(cache_file)):
+            return loadCompiledHierarchy(cache_file), cache_file
+    return compileHierarchy(Loaders.loadHierarchyFromEdgeList(file, level)), cache_file
+
+"""
+This method stores a compiled hierarchy (with the root paths memoized during evaluation) in the cache.
+"""
+def saveHierarchy(hierarchy, cache_file):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+    tmp_file = cache_file+"."+str(os.getpid())+".tmp"
+    hierarchy.save(tmp_file)
+    os.replace(tmp_file, cache_file)
+
+"""
+This method returns an iterator over the evaluation samples (id, true labels, prediction paths) of one prediction file.
+"""
+def iterateSamples(args, hierarchy, pred_file, root_paths):
+    if(args.format=="germeval"):
+        if(args.stream):
+            return Loaders.iterateEvaluationData_GermEval(hierarchy, args.truth, pred_file, args.subtask, root_paths)
+        return iter(Loaders.loadEvaluationData_GermEval(hierarchy, args.truth, pred_file, args.subtask, root_paths))
+    if(args.format=="transposon"):
+        if(args.stream):
+            return Loaders.iterateEvaluationData_Transposon(hierarchy, args.truth, pred_file)
+        return iter(Loaders.loadEvaluationData_Transposon(hierarchy, args.truth, pred_file))
+    if(args.stream):
+        return Loaders.iterateEvaluationData_Binary(hierarchy, args.truth, pred_file, root_paths)
+    return iter(Loaders.loadEvaluationData_Binary(hierarchy, args.truth, pred_file, root_paths))
+
+"""
+This method sums the hierarchical confusion matrices of a list of samples, it returns the sum, the number of samples,
+and with per_sample also the array of the confusion matrices of the samples (one row each, None otherwise).
+"""
+def scoreSamples(hierarchy, samples, per_sample=False):
+    total = np.zeros(4, dtype=np.int64)
+    matrices = np.zeros((len(samples), 4), dtype=np.int64) if per_sample else None
+    for i, (key, true_labels, pred_paths) in enumerate(samples):
+        mat = determineHierarchicalConfusionMatrix(hierarchy, true_labels, pred_paths)
+        total += mat.astype(np.int64)
+        if(per_sample):
+            matrices[i] = mat
+    return total, len(samples), matrices
+
+"""
+This method initializes a worker process with the compiled hierarchy, and enables profiling in it if profile is set.
+"""
+def initWorker(hierarchy, profile=False):
+    global worker_hierarchy
+    worker_hierarchy = hierarchy
+    if(profile):
+        Profiling.enableProfiling()
+
+"""
+This method scores a chunk of samples in a worker process.
+It returns the results of scoreSamples and the stage statistics recorded for this chunk (None without profiling),
+which are merged into the statistics of the main process.
+"""
+def scoreChunk(samples, per_sample=False):
+    if(not Profiling.enabled):
+        return scoreSamples(worker_hierarchy, samples, per_sample) + (None,)
+    Profiling.resetProfiling()
+    result = scoreSamples(worker_hierarchy, samples, per_sample)
+    return result + (Profiling.getProfilingStatistics(),)
+
+"""
+This method splits an iterator of samples into lists of at most size samples.
+"""
+def iterateChunks(samples, size):
+    while True:
+        chunk = list(itertools.islice(samples, size))
+        if(len(chunk)==0):
+            return
+        yield chunk
+
+"""
+This method scores all samples of an iterator, either in this process or on a pool of worker processes.
+At most two chunks per worker are pending at any time, so streamed samples are never all held in memory.
+Chunks are collected in the order of the samples, and with a SampleResultWriter the confusion matrix of every sample is written to it.
+The stage statistics recorded by the workers are merged into the statistics of this process.
+"""
+def scoreIterator(hierarchy, samples, chunk_size, pool=None, workers=1, writer=None):
+    total = np.zeros(4, dtype=np.int64)
+    n = 0
+    per_sample = writer is not None
+    if(pool is None):
+        for chunk in iterateChunks(samples, chunk_size):
+            t, c, matrices = scoreSamples(hierarchy, chunk, per_sample)
+            total += t
+            n += c
+            if(per_sample):
+                writer.appendMany([key for key, _, _ in chunk], matrices)
+        return total, n
+    pending = collections.deque()
+    for chunk in iterateChunks(samples, chunk_size):
+        keys = [key for key, _, _ in chunk] if per_sample else None
+        pending.append((keys, pool.submit(scoreChunk, chunk, per_sample)))
+        if(len(pending) >= 2*workers):
+            keys, future = pending.popleft()
+            t, c, matrices, statistics = future.result()
+            total += t
+            n += c
+            if(per_sample):
+                writer.appendMany(keys, matrices)
+            if(statistics is not None):
+                Profiling.mergeProfilingStatistics(statistics)
+    while len(pending)!=0:
+        keys, future = pending.popleft()
+        t, c, matrices, statistics = future.result()
+        total += t
+        n += c
+        if(per_sample):
+            writer.appendMany(keys, matrices)
+        if(statistics is not None):
+            Profiling.mergeProfilingStatistics(statistics)
+    return total, n
+
+"""
+This method creates the result row of one prediction file with totals and evaluation measures.
+"""
+def createResultRow(pred_file, total, n):
+    row = {}
+    row["file"] = pred_file
+    row["samples"] = int(n)
+    row["TP"] = int(total[0])
+    row["TN"] = int(total[1])
+    row["FP"] = int(total[2])
+    row["FN"] = int(total[3])
+    row.update(determineEvaluationMeasures(total))
+    return row
+
+"""
+This method formats the result rows as JSON or CSV text.
+Undefined measures (nan, zero denominator) are written as null in JSON, so that strict JSON parsers accept the output.
+"""
+def formatRows(rows, output_format):
+    if(output_format=="json"):
+        rows = [{key: (None if isinstance(value, float) and np.isnan(value) else value) for key, value in row.items()} for row in rows]
+        return json.dumps(rows, indent=1, allow_nan=False)+"\n"
+    text = io.StringIO()
+    fieldnames = ["file","samples","TP","TN","FP","FN","F1","PPV","REC","ACC","MCC"]
+    if(len(rows)!=0 and "per_sample" in rows[0]):
+        fieldnames.append("per_sample")
+    writer = csv.DictWriter(text, fieldnames=fieldnames, lineterminator="\n")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    return text.getvalue()
+
+"""
+This method returns the per-sample result file of a prediction file, which is named after the prediction file (with its index,
+so that prediction files with the same name in different folders do not collide).
+"""
+def getPerSampleFile(per_sample_dir, i, pred_file):
+    return os.path.join(per_sample_dir, str(i)+"_"+os.path.basename(pred_file)+".npy")
+
+"""
+This method runs the "evaluate" command: it loads (or reuses) the compiled hierarchy once,
+scores every prediction file against the true labels and writes totals and measures per file.
+With --per-sample the confusion matrix of every sample is also written to a result file per prediction file (see SampleResults).
+"""
+def evaluate(args):
+    if(args.profile!=""):
+        Profiling.enableProfiling()
+    level = 1 if (args.format=="germeval" and args.subtask=="a") else -1
+    hierarchy, cache_file = loadHierarchy(args.hierarchy, level, args.cache)
+    root_paths = {}
+    pool = None
+    if(args.workers > 1):
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, initializer=initWorker, initargs=(hierarchy, args.profile!=""))
+    rows = []
+    try:
+        for i, pred_file in enumerate(args.pred):
+            samples = iterateSamples(args, hierarchy, pred_file, root_paths)
+            if(args.per_sample==""):
+                total, n = scoreIterator(hierarchy, samples, args.chunk_size, pool, args.workers)
+                rows.append(createResultRow(pred_file, total, n))
+                continue
+            os.makedirs(args.per_sample, exist_ok=True)
+            per_sample_file = getPerSampleFile(args.per_sample, i, pred_file)
+            with SampleResultWriter(per_sample_file, overwrite=True) as writer:
+                total, n = scoreIterator(hierarchy, samples, args.chunk_size, pool, args.workers, writer)
+            rows.append(createResultRow(pred_file, total, n))
+            rows[-1]["per_sample"] = per_sample_file
+    finally:
+        if(pool is not None):
+            pool.shutdown()
+    if(cache_file!=""):
+        saveHierarchy(hierarchy, cache_file)
+    text = formatRows(rows, args.output_format)
+    if(args.output==""):
+        sys.stdout.write(text)
+    else:
+        f = open(args.output, "w", encoding="utf8")
+        f.write(text)
+        f.close()
+    if(args.profile!=""):
+        Profiling.exportProfilingStatistics(args.profile)
+    return 0
+
+"""
+This method converts a command line argument to an integer of at least 1.
+"""
+def positiveInteger(text):
+    value = int(text)
+    if(value < 1):
+        raise argparse.ArgumentTypeError("must be at least 1, got "+text)
+    return value
+
+"""
+This method creates the argument parser of the command line interface.
+"""
+def createParser():
+    parser = argparse.ArgumentParser(prog="hcm", description="Hierarchical confusion matrix evaluation.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+    p = commands.add_parser("evaluate", help="evaluate one or more prediction files against true labels")
+    p.add_argument("--hierarchy", required=True, help="hierarchy file with one tab separated edge \"parent<TAB>child\" per line")
+    p.add_argument("--truth", required=True, help="file with the true labels")
+    p.add_argument("--pred", required=True, nargs="+", help="one or more files with predictions")
+    p.add_argument("--format", required=True, choices=["germeval","transposon","binary"], help="format of the label files")
+    p.add_argument("--subtask", default="b", choices=["a","b"], help="GermEval2019 subtask (default: b)")
+    p.add_argument("--workers", type=int, default=1, help="number of worker processes (default: 1)")
+    p.add_argument("--stream", action="store_true", help="stream the samples instead of loading each file completely")
+    p.add_argument("--chunk-size", type=positiveInteger, default=1000, help="samples per chunk sent to a worker (default: 1000)")
+    p.add_argument("--cache", default="", help="directory to store and reuse compiled hierarchies")
+    p.add_argument("--output", default="", help="output file (default: stdout)")
+    p.add_argument("--output-format", default="json", choices=["json","csv"], help="output format (default: json)")
+    p.add_argument("--per-sample", default="", help="directory to write the confusion matrix of every sample to, one .npy file per prediction file")
+    p.add_argument("--profile", default="", help="record stage statistics and write them to this JSON file")
+    p.set_defaults(func=evaluate)
+    return parser
+
+"""
+This method is the entry point of the "hcm" command.
+"""
+def main(argv=None):
+    parser = createParser()
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        sys.stderr.write("hcm: error: "+str(e)+"\n")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
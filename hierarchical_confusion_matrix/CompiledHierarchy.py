@@ -0,0 +1,266 @@
+# Imports
+import pickle
+import collections
+
+
+
+
+# Classes
+"""
+This class holds a precompiled copy of a hierarchy (networkx.DiGraph) for fast repeated evaluation.
+It stores the successors and predecessors of every node as lists, and memoizes the paths from "root" to every node
+in the same order as networkx.all_simple_paths(graph, "root", node) would return them, as well as the scores of compared path pairs
+(the max_pair_scores most recently used ones).
+It can be passed instead of the graph to determineHierarchicalConfusionMatrix and createMinimPathsFromLabels,
+and it can be pickled and loaded without networkx.
+The hierarchy can be changed with add_edge, remove_edge, remove_node and move_node, which only invalidate the memoized
+values of the affected nodes. Every change increases version, results computed with an older version are stale.
+"""
+class CompiledHierarchy:
+    def __init__(self, graph, max_pair_scores=100000):
+        self.succ = {}
+        self.pred = {}
+        for node in graph.nodes:
+            self.succ[node] = list(graph.successors(node))
+            self.pred[node] = list(graph.predecessors(node))
+        self.root_paths = {}
+        self.pair_scores = collections.OrderedDict()
+        self.max_pair_scores = max_pair_scores
+        self.version = 0
+
+    """
+    This method returns the number of nodes in the hierarchy.
+    """
+    def number_of_nodes(self):
+        return len(self.succ)
+
+    """
+    This method returns the list of nodes in the hierarchy.
+    """
+    def nodes(self):
+        return list(self.succ.keys())
+
+    """
+    This method returns the list of successors (children) of node t.
+    """
+    def successors(self, t):
+        return self.succ[t]
+
+    """
+    This method returns the list of successors (children) of node t, like networkx.DiGraph.neighbors.
+    """
+    def neighbors(self, t):
+        return self.succ[t]
+
+    """
+    This method returns the list of predecessors (parents) of node t.
+    """
+    def predecessors(self, t):
+        return self.pred[t]
+
+    def __contains__(self, t):
+        return t in self.succ
+
+    """
+    This method returns all paths from "root" to a given node (memoized, do not modify the returned lists).
+    """
+    def getRootPaths(self, node):
+        if(node not in self.root_paths):
+            self.compileRootPaths(node)
+        return self.root_paths[node]
+
+    """
+    This method computes the root paths of a node and of all its not yet compiled ancestors, parents before children.
+    Paths to a node are the paths to its parents extended by the node. With several parents they are sorted by the sequence
+    of child positions along the path, which is the depth first order of networkx.all_simple_paths.
+    The positions are not stored: removing an edge shifts the positions of later siblings, but keeps the relative order
+    of all other memoized paths, so only the paths below the removed edge have to be recomputed.
+    """
+    def compileRootPaths(self, node):
+        if(node not in self.succ or "root" not in self.succ):
+            self.root_paths[node] = []
+            return
+        if("root" not in self.root_paths):
+            self.root_paths["root"] = [["root"]]
+        order = []
+        visited = set()
+        stack = [(node, False)]
+        while len(stack)!=0:
+            t, expanded = stack.pop()
+            if(expanded):
+                order.append(t)
+                continue
+            if(t in visited or t in self.root_paths):
+                continue
+            visited.add(t)
+            stack.append((t, True))
+            for parent in self.pred[t]:
+                if(parent not in visited and parent not in self.root_paths):
+                    stack.append((parent, False))
+        positions = {}
+        for t in order:
+            paths = []
+            for parent in self.pred[t]:
+                for path in self.root_paths[parent]:
+                    paths.append(path+[t])
+            if(len(self.pred[t]) > 1):
+                paths.sort(key=lambda path: self.getPathPositions(path, positions))
+            self.root_paths[t] = paths
+
+    """
+    This method returns the sequence of child positions along a path, positions is a dict that caches them by edge.
+    """
+    def getPathPositions(self, path, positions):
+        key = []
+        for i in range(0, len(path)-1):
+            edge = (path[i], path[i+1])
+            if(edge not in positions):
+                positions[edge] = self.succ[path[i]].index(path[i+1])
+            key.append(positions[edge])
+        return key
+
+    """
+    This method returns the memoized score of a pair of paths (and marks it as recently used), or None if it is not known.
+    """
+    def getPairScore(self, path_true, path_pred):
+        key = (tuple(path_true), tuple(path_pred))
+        score = self.pair_scores.get(key)
+        if(score is not None):
+            self.pair_scores.move_to_end(key)
+        return score
+
+    """
+    This method memoizes the score of a pair of paths, evicting the least recently used score when there are max_pair_scores entries.
+    """
+    def setPairScore(self, path_true, path_pred, score):
+        if(len(self.pair_scores) >= self.max_pair_scores):
+            self.pair_scores.popitem(last=False)
+        self.pair_scores[(tuple(path_true), tuple(path_pred))] = score
+
+    """
+    This method returns a node and all its descendants.
+    """
+    def getSubtree(self, node):
+        subtree = set([node])
+        stack = [node]
+        while len(stack)!=0:
+            for child in self.succ[stack.pop()]:
+                if(child not in subtree):
+                    subtree.add(child)
+                    stack.append(child)
+        return subtree
+
+    """
+    This method adds an edge from parent u to child v (adding missing nodes), like networkx.DiGraph.add_edge.
+    The root paths of v and its descendants, and the pair scores involving u, v or the children of u are invalidated.
+    """
+    def add_edge(self, u, v):
+        for node in [u, v]:
+            if(node not in self.succ):
+                self.succ[node] = []
+                self.pred[node] = []
+        if(v in self.succ[u]):
+            return
+        subtree = self.getSubtree(v)
+        if(u in subtree):
+            raise ValueError("Edge ("+str(u)+", "+str(v)+") would create a cycle")
+        score_nodes = set([u, v]) | set(self.succ[u])
+        self.succ[u].append(v)
+        self.pred[v].append(u)
+        self.invalidate(subtree, score_nodes)
+
+    """
+    This method removes the edge from parent u to child v.
+    The root paths of v and its descendants, and the pair scores involving u, v or the children of u are invalidated.
+    """
+    def remove_edge(self, u, v):
+        if(u not in self.succ or v not in self.succ[u]):
+            raise ValueError("Edge ("+str(u)+", "+str(v)+") is not in the hierarchy")
+        subtree = self.getSubtree(v)
+        score_nodes = set([u, v]) | set(self.succ[u])
+        self.succ[u].remove(v)
+        self.pred[v].remove(u)
+        self.invalidate(subtree, score_nodes)
+
+    """
+    This method removes a node and all its edges, like networkx.DiGraph.remove_node.
+    Its children stay in the hierarchy (without this parent).
+    The root paths of the node and its descendants, and the pair scores involving the node, its parents, siblings or children are invalidated.
+    """
+    def remove_node(self, t):
+        if(t not in self.succ):
+            raise ValueError("Node "+str(t)+" is not in the hierarchy")
+        if(t=="root"):
+            raise ValueError("The node root cannot be removed")
+        subtree = self.getSubtree(t)
+        score_nodes = set([t]) | set(self.succ[t])
+        for parent in self.pred[t]:
+            score_nodes |= set([parent]) | set(self.succ[parent])
+        for parent in self.pred[t]:
+            self.succ[parent].remove(t)
+        for child in self.succ[t]:
+            self.pred[child].remove(t)
+        del self.succ[t]
+        del self.pred[t]
+        self.invalidate(subtree, score_nodes)
+
+    """
+    This method moves a node (with its descendants) from all its current parents to a new parent (adding it if missing),
+    as one change: the root paths of the node and its descendants, and the pair scores involving the node, its old and new parents
+    or their children are invalidated once.
+    """
+    def move_node(self, t, new_parent):
+        if(t not in self.succ):
+            raise ValueError("Node "+str(t)+" is not in the hierarchy")
+        subtree = self.getSubtree(t)
+        if(new_parent in subtree):
+            raise ValueError("Node "+str(t)+" cannot be moved below itself or its descendant "+str(new_parent))
+        if(new_parent not in self.succ):
+            self.succ[new_parent] = []
+            self.pred[new_parent] = []
+        score_nodes = set([t, new_parent]) | set(self.succ[new_parent])
+        for parent in self.pred[t]:
+            score_nodes |= set([parent]) | set(self.succ[parent])
+            self.succ[parent].remove(t)
+        self.pred[t] = [new_parent]
+        self.succ[new_parent].append(t)
+        self.invalidate(subtree, score_nodes)
+
+    """
+    This method deletes the memoized root paths of path_nodes and the memoized pair scores that involve any of score_nodes,
+    and increases the version.
+    """
+    def invalidate(self, path_nodes, score_nodes):
+        for node in path_nodes:
+            self.root_paths.pop(node, None)
+        for key in list(self.pair_scores.keys()):
+            if(not score_nodes.isdisjoint(key[0]) or not score_nodes.isdisjoint(key[1])):
+                del self.pair_scores[key]
+        self.version += 1
+
+    """
+    This method stores the compiled hierarchy (including all memoized root paths) in a file.
+    """
+    def save(self, file):
+        f = open(file, "wb")
+        pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.close()
+
+
+
+
+# Methods
+"""
+This method compiles a hierarchy (networkx.DiGraph) for fast repeated evaluation.
+"""
+def compileHierarchy(graph):
+    return CompiledHierarchy(graph)
+
+"""
+This method loads a compiled hierarchy stored with CompiledHierarchy.save.
+"""
+def loadCompiledHierarchy(file):
+    f = open(file, "rb")
+    hierarchy = pickle.load(f)
+    f.close()
+    return hierarchy
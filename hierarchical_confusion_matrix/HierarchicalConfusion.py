@@ -1,6 +1,9 @@
-# Imports
-import networkx as nx
+# Imports (networkx is only imported on first use, so that compiled hierarchies can be scored without it)
+import time
+import heapq
 import numpy as np
+from . import Profiling
+from .CompiledHierarchy import CompiledHierarchy
 
 
 
@@ -10,28 +13,33 @@ import numpy as np
 This method determines the hierarchical confusion matrix for a given problem with structure "graph", true labels "true_labels" and prediction "pred_labels".
 """
 def determineHierarchicalConfusionMatrix(graph, true_labels, pred_labels):
+    profiling = Profiling.enabled
+    if(profiling):
+        start = t = time.perf_counter()
     confusion_hk = []
     pred_labels, w_dj = generateSortedPredictions(graph, true_labels, pred_labels) # Includes Step 1 and 2
-    for pred_path in pred_labels:  # Step 3
-        if (len(w_dj.keys())==0): # Step 3.1
+    if(profiling):
+        n_true_paths = sum([len(w_dj[n]) for n in w_dj])
+        t = Profiling.recordStage("sorting", t, n_true_paths, "true_paths")
+    for sel_true_path, pred_path in matchPredictionPaths(pred_labels, w_dj):  # Step 3
+        if (sel_true_path is None): # Step 3.1
             confusion_hk.append([0, 0, len(pred_path)-1, 0])
         else:
-            m_max = -1
-            sel_true_path = ""
-            sel_true_label = ""
-            for n in w_dj:
-                for p in w_dj[n]:
-                    m_val = len(getCommonPath(p,pred_path))
-                    if(m_val > m_max):
-                        m_max = m_val
-                        sel_true_label = n # Step 3.2
-                        sel_true_path  = p
-            confusion_hk.append(getHierarchicalConfusion_Tree_SPL_MLNP(graph, sel_true_path, pred_path)) # Step 3.3
-            del w_dj[sel_true_label] # Step 3.4
+            if(profiling):
+                t = time.perf_counter()
+            confusion_hk.append(getPairScore(graph, sel_true_path, pred_path)) # Step 3.3
+            if(profiling):
+                t = Profiling.recordStage("pair_scoring", t)
+    if(profiling):
+        t = time.perf_counter()
     confusion_matrix = np.sum(np.asarray(confusion_hk), axis=0) # Step 4
     if(len(w_dj.keys())!=0):
         for key in w_dj:
             confusion_matrix[3] += getShortestPathLength(w_dj[key])
+        if(profiling):
+            Profiling.recordStage("fn_topup", t, sum([len(w_dj[n]) for n in w_dj]), "true_paths")
+    if(profiling):
+        Profiling.recordStage("total", start, n_true_paths, "true_paths")
     return confusion_matrix
     
 """
@@ -46,17 +54,55 @@ def generateSortedPredictions(graph, true_labels, pred_labels):
     m.reverse()
     return pred_labels, w_dj
 
+"""
+This method pairs every prediction path (in sorted order) with the true path it is compared with (Step 3.2),
+or with None if no true label is left (Step 3.1). The true label of every selected path is removed from w_dj (Step 3.4),
+so that w_dj keeps the true labels left for Step 4.
+It returns the list of (true path or None, prediction path).
+"""
+def matchPredictionPaths(pred_labels, w_dj):
+    profiling = Profiling.enabled
+    pairs = []
+    for pred_path in pred_labels:
+        if (len(w_dj.keys())==0): # Step 3.1
+            pairs.append((None, pred_path))
+            continue
+        if(profiling):
+            t = time.perf_counter()
+        m_max = -1
+        sel_true_path = ""
+        sel_true_label = ""
+        for n in w_dj:
+            for p in w_dj[n]:
+                m_val = len(getCommonPath(p,pred_path))
+                if(m_val > m_max):
+                    m_max = m_val
+                    sel_true_label = n # Step 3.2
+                    sel_true_path  = p
+        if(profiling):
+            Profiling.recordStage("matching", t, sum([len(w_dj[n]) for n in w_dj]), "true_paths")
+        pairs.append((sel_true_path, pred_path))
+        del w_dj[sel_true_label] # Step 3.4
+    return pairs
+
 """
 This method determines a set of true paths w_dj from the true_labels.
 """
 def determineTruePathSet(graph, true_labels):
     w_dj = {}
     for node in true_labels:
-        w_dj[node] = []
-        for path in nx.all_simple_paths(graph, source="root", target=node):
-            w_dj[node].append(path)
+        w_dj[node] = getRootPaths(graph, node)
     return w_dj
 
+"""
+This method returns a list of all paths from "root" to a given node in a graph (or compiled hierarchy).
+"""
+def getRootPaths(graph, node):
+    if(isinstance(graph, CompiledHierarchy)):
+        return list(graph.getRootPaths(node))
+    import networkx as nx
+    return list(nx.all_simple_paths(graph, source="root", target=node))
+
 """
 This method determines the M values for predictions and true paths w_dj.
 """
@@ -84,6 +130,19 @@ def getCommonPath(true_path, pred_path):
             break
     return common_path
 
+"""
+This method returns the four values of the confusion matrix for two paths path_true and path_pred,
+memoized on a compiled hierarchy.
+"""
+def getPairScore(graph, path_true, path_pred):
+    if(not isinstance(graph, CompiledHierarchy)):
+        return getHierarchicalConfusion_Tree_SPL_MLNP(graph, path_true, path_pred)
+    score = graph.getPairScore(path_true, path_pred)
+    if(score is None):
+        score = getHierarchicalConfusion_Tree_SPL_MLNP(graph, path_true, path_pred)
+        graph.setPairScore(path_true, path_pred, score)
+    return score
+
 """
 This method determines the four values of the confusion matrix TP, TN, FP, FN for two paths path_true and path_pred
 """
@@ -120,13 +179,97 @@ def deleteFromPath(path, to_delete):
 This method determines the shortest path length amongst a list of given paths.
 """
 def getShortestPathLength(paths):
+    return len(getShortestPath(paths))-1
+
+"""
+This method determines the shortest path (the first one on ties) amongst a list of given paths, or [] if there is none.
+"""
+def getShortestPath(paths):
     min_l = -1
     shortest_path = []
     for path in paths:
         if((min_l == -1) or (len(path)<min_l)):
             min_l = len(path)
             shortest_path = path
-    return len(shortest_path)-1
+    return shortest_path
+
+"""
+This method creates the minimum set of paths from "root" that covers all nodes in label_data.
+Paths are chosen greedily, always taking the path that covers most of the remaining labels (first one on ties).
+Optionally, a dict root_paths can be passed that caches the paths from "root" to each label across calls.
+"""
+def createMinimPathsFromLabels(graph, label_data, root_paths=None):
+    if(len(label_data)==0):
+        return []
+    profiling = Profiling.enabled
+    if(profiling):
+        start = time.perf_counter()
+    if(root_paths is None):
+        root_paths = {}
+    remaining_nodes = {}
+    for node in label_data:
+        remaining_nodes[node] = remaining_nodes.get(node, 0) + 1
+    candidate_paths = []
+    candidate_nodes = []
+    for node in label_data:
+        if(node not in root_paths):
+            root_paths[node] = [(p, frozenset(p)) for p in getRootPaths(graph, node)]
+        for path, nodes in root_paths[node]:
+            candidate_paths.append(path)
+            candidate_nodes.append(nodes)
+    # Priority queue of (-covered labels, path index), scores only shrink so stale entries are upper bounds
+    heap = []
+    for idx in range(0,len(candidate_paths)):
+        heap.append((-countRemainingNodes(candidate_nodes[idx], remaining_nodes), idx))
+    heapq.heapify(heap)
+    selected_paths = []
+    while len(remaining_nodes)!=0:
+        if(len(heap)==0 or heap[0][0]==0):
+            raise ValueError("No path from root covers the labels "+str(list(remaining_nodes.keys())))
+        score, idx = heapq.heappop(heap)
+        current = countRemainingNodes(candidate_nodes[idx], remaining_nodes)
+        if(current != -score):
+            heapq.heappush(heap, (-current, idx))
+            continue
+        # Add path to selected paths and remove its labels from remaining
+        selected_paths.append(candidate_paths[idx].copy())
+        for node in candidate_nodes[idx]:
+            if(node in remaining_nodes):
+                del remaining_nodes[node]
+    if(profiling):
+        Profiling.recordStage("path_cover", start, len(candidate_paths), "candidate_paths")
+    return selected_paths
+
+"""
+This method counts how many of the remaining labels (with multiplicity) lie on a path given by its set of nodes.
+"""
+def countRemainingNodes(path_nodes, remaining_nodes):
+    ctr = 0
+    for node in path_nodes:
+        ctr += remaining_nodes.get(node, 0)
+    return ctr
+
+"""
+This method determines the evaluation measures F1, PPV, REC, ACC and MCC from a hierarchical confusion matrix (TP, TN, FP, FN).
+Measures with a zero denominator are returned as nan.
+"""
+def determineEvaluationMeasures(mat):
+    tp, tn, fp, fn = [float(x) for x in mat[:4]]
+    measures = {}
+    measures["F1"]  = divideOrNan(2*tp, 2*tp+fp+fn)
+    measures["PPV"] = divideOrNan(tp, tp+fp)
+    measures["REC"] = divideOrNan(tp, tp+fn)
+    measures["ACC"] = divideOrNan(tp+tn, tp+tn+fp+fn)
+    measures["MCC"] = divideOrNan(tp*tn-fp*fn, np.sqrt((tp+fp)*(tp+fn)*(tn+fp)*(tn+fn)))
+    return measures
+
+"""
+This method divides a by b, and returns nan if b is zero.
+"""
+def divideOrNan(a, b):
+    if(b==0):
+        return float("nan")
+    return float(a/b)
 
 """
 This method prints the hierarchical confusion matrix to the console.
@@ -176,8 +319,9 @@ def getLeafNode(path):
     return path[-1]
         
 """
-This method 
+This method draws the edges of a path with a given color and width (in a single drawing call).
+To draw many paths at once, use aggregatePathEdges and drawEdgeHeatmap.
 """
 def drawPath(graph, pos, path, color, width):
-    for i in range(0,len(path)-1):
-        nx.draw_networkx_edges(graph, pos=pos,edgelist=[(path[i],path[i+1])], edge_color=color, width=width)
+    import networkx as nx
+    nx.draw_networkx_edges(graph, pos=pos, edgelist=list(zip(path[:-1], path[1:])), edge_color=color, width=width)
@@ -0,0 +1,180 @@
+# Imports
+from .HierarchicalConfusion import getRootPaths, getLeafNode, createMinimPathsFromLabels
+from .Profiling import profiled, profiledIterator
+
+
+
+
+# Methods
+"""
+This method loads a hierarchy from a file with one tab separated edge "parent<TAB>child" per line, and returns it as a graph object.
+All nodes without parent are connected to the node "root". With level=1 only these first level nodes are kept.
+"""
+@profiled("loader:hierarchy")
+def loadHierarchyFromEdgeList(file, level=-1):
+    import networkx as nx
+    f = open(file, "r", encoding="utf8")
+    edges = []
+    for line in f.read().split("\n"):
+        if(line.strip()!=""):
+            edges.append(line.split("\t")[:2])
+    f.close()
+    children = set([e[1] for e in edges])
+    root_nodes = []
+    for e in edges:
+        if(e[0]!="root" and e[0] not in children and e[0] not in root_nodes):
+            root_nodes.append(e[0])
+    if(level==1):
+        edges = [e for e in edges if e[0]=="root"]
+    for n in root_nodes:
+        edges.append(["root",n])
+    graph = nx.DiGraph()
+    graph.add_edges_from(edges)
+    return graph
+
+"""
+This method returns the classes (all nodes except "root") of a hierarchy in the order of their first appearance.
+This is the column order of the per-node values in the transposon and binary formats.
+"""
+def getClassOrder(hierarchy):
+    return [node for node in list(hierarchy.nodes()) if node!="root"]
+
+"""
+This method iterates the label sets of one subtask ("subtask_a" or "subtask_b") of a GermEval2019 label file as (id, labels).
+Empty labels (e.g. from trailing tabs) are dropped. A ValueError is raised if the file has no section for the subtask
+(some submissions only contain one subtask), so that such files are not scored as if nothing was predicted.
+"""
+def iterateGermEvalLabels(file, subtask):
+    f = open(file, "r", encoding="utf8")
+    found = False
+    for line in f:
+        line = line.rstrip("\n")
+        if(not found):
+            found = (line==subtask)
+            continue
+        if(line=="" or line.startswith("subtask_")):
+            break
+        parts = line.split("\t")
+        yield parts[0], [p for p in parts[1:] if p!=""]
+    f.close()
+    if(not found):
+        raise ValueError("File "+file+" has no section "+subtask)
+
+"""
+This method reads the label sets of one subtask of a GermEval2019 label file as a dict id -> list of labels.
+"""
+@profiled("loader:germeval_labels")
+def readGermEvalLabels(file, subtask):
+    return dict(iterateGermEvalLabels(file, subtask))
+
+"""
+This method iterates the evaluation data of GermEval2019 as (id, true labels, prediction paths).
+For subtask "a" predictions are first level nodes, for subtask "b" label sets are converted with createMinimPathsFromLabels.
+Samples without any prediction get the path ["root"]. Only the true labels are kept in memory, predictions are streamed.
+"""
+@profiledIterator("loader:germeval")
+def iterateEvaluationData_GermEval(hierarchy, true_label_file, pred_label_file, subtask="b", root_paths=None):
+    if(root_paths is None):
+        root_paths = {}
+    true_label_data = readGermEvalLabels(true_label_file, "subtask_"+subtask)
+    for key, labels in iterateGermEvalLabels(pred_label_file, "subtask_"+subtask):
+        if(key in true_label_data):
+            yield convertGermEvalSample(hierarchy, key, true_label_data.pop(key), labels, subtask, root_paths)
+    for key in true_label_data:
+        yield convertGermEvalSample(hierarchy, key, true_label_data[key], [], subtask, root_paths)
+
+"""
+This method converts the true and predicted labels of one GermEval2019 sample to (id, true labels, prediction paths).
+"""
+def convertGermEvalSample(hierarchy, key, true_labels, pred_labels, subtask, root_paths):
+    if(subtask=="a"):
+        pred_paths = [["root",n] for n in pred_labels]
+    else:
+        true_labels = [getLeafNode(p) for p in createMinimPathsFromLabels(hierarchy, true_labels, root_paths)]
+        pred_paths = createMinimPathsFromLabels(hierarchy, pred_labels, root_paths)
+    if(len(pred_paths)==0):
+        pred_paths = [["root"]]
+    return key, true_labels, pred_paths
+
+"""
+This method decodes one line of per-class probabilities (in the order of classes) to a label,
+by descending from "root" to the most probable child until a leaf is reached (see Example_TransposonClassification.py).
+"""
+def decodeProbabilityLine(hierarchy, class_index, line):
+    probs = [float(p) for p in line.split()]
+    node = "root"
+    while True:
+        best = ""
+        mx = -1
+        for child in sorted(hierarchy.successors(node), key=class_index.get):
+            if(probs[class_index[child]]>mx):
+                mx = probs[class_index[child]]
+                best = child
+        if(best==""):
+            return node
+        node = best
+
+"""
+This method iterates the non-empty lines of a file, stopping at the first empty line.
+"""
+def iterateLines(file):
+    f = open(file, "r", encoding="utf8")
+    for line in f:
+        if(line.strip()==""):
+            break
+        yield line
+    f.close()
+
+"""
+This method iterates the evaluation data of the transposon format as (line number, true labels, prediction paths).
+Both files contain one line of whitespace separated per-class probabilities per sample, which are decoded with decodeProbabilityLine.
+"""
+@profiledIterator("loader:transposon")
+def iterateEvaluationData_Transposon(hierarchy, true_label_file, pred_label_file):
+    class_index = {c: i for i, c in enumerate(getClassOrder(hierarchy))}
+    key = 0
+    for true_line, pred_line in zip(iterateLines(true_label_file), iterateLines(pred_label_file)):
+        true_label = decodeProbabilityLine(hierarchy, class_index, true_line)
+        pred_label = decodeProbabilityLine(hierarchy, class_index, pred_line)
+        yield key, [true_label], [getRootPaths(hierarchy, pred_label)[-1]]
+        key += 1
+
+"""
+This method iterates the evaluation data of the binary format as (line number, true labels, prediction paths).
+Both files contain one line of whitespace separated per-class indicators (1 or 0) per sample,
+the labels set to 1 are converted with createMinimPathsFromLabels.
+"""
+@profiledIterator("loader:binary")
+def iterateEvaluationData_Binary(hierarchy, true_label_file, pred_label_file, root_paths=None):
+    if(root_paths is None):
+        root_paths = {}
+    classes = getClassOrder(hierarchy)
+    key = 0
+    for true_line, pred_line in zip(iterateLines(true_label_file), iterateLines(pred_label_file)):
+        true_labels = [classes[i] for i, v in enumerate(true_line.split()) if float(v)>=0.5]
+        pred_labels = [classes[i] for i, v in enumerate(pred_line.split()) if float(v)>=0.5]
+        true_labels = [getLeafNode(p) for p in createMinimPathsFromLabels(hierarchy, true_labels, root_paths)]
+        pred_paths = createMinimPathsFromLabels(hierarchy, pred_labels, root_paths)
+        if(len(pred_paths)==0):
+            pred_paths = [["root"]]
+        yield key, true_labels, pred_paths
+        key += 1
+
+"""
+This method loads the evaluation data of GermEval2019 as a list of (id, true labels, prediction paths).
+The loaders are recorded as the stages of their iterators ("loader:germeval", "loader:transposon", "loader:binary").
+"""
+def loadEvaluationData_GermEval(hierarchy, true_label_file, pred_label_file, subtask="b", root_paths=None):
+    return list(iterateEvaluationData_GermEval(hierarchy, true_label_file, pred_label_file, subtask, root_paths))
+
+"""
+This method loads the evaluation data of the transposon format as a list of (line number, true labels, prediction paths).
+"""
+def loadEvaluationData_Transposon(hierarchy, true_label_file, pred_label_file):
+    return list(iterateEvaluationData_Transposon(hierarchy, true_label_file, pred_label_file))
+
+"""
+This method loads the evaluation data of the binary format as a list of (line number, true labels, prediction paths).
+"""
+def loadEvaluationData_Binary(hierarchy, true_label_file, pred_label_file, root_paths=None):
+    return list(iterateEvaluationData_Binary(hierarchy, true_label_file, pred_label_file, root_paths))
@@ -0,0 +1,150 @@
+# Imports
+import json
+import time
+import functools
+
+
+
+
+# Profiling state, disabled by default so the instrumented code only pays for one attribute lookup per stage
+enabled = False
+statistics = {}
+
+
+
+
+# Methods
+"""
+This method enables the recording of stage statistics (and resets previous statistics unless reset=False).
+"""
+def enableProfiling(reset=True):
+    global enabled
+    if(reset):
+        resetProfiling()
+    enabled = True
+
+"""
+This method disables the recording of stage statistics, recorded statistics are kept.
+"""
+def disableProfiling():
+    global enabled
+    enabled = False
+
+"""
+This method deletes all recorded stage statistics.
+"""
+def resetProfiling():
+    statistics.clear()
+
+"""
+This method records one call of a stage that started at time start (time.perf_counter()),
+optionally with the number of paths the stage processed and what kind of paths were counted (e.g. "true_paths").
+Stages recorded without paths have no path fields in the statistics.
+It returns the current time, so that consecutive stages can be chained.
+"""
+def recordStage(stage, start, paths=None, counted="paths"):
+    now = time.perf_counter()
+    if(stage not in statistics):
+        statistics[stage] = {"calls": 0, "seconds": 0.0}
+    entry = statistics[stage]
+    entry["calls"] += 1
+    entry["seconds"] += now - start
+    if(paths is not None):
+        if("paths_total" not in entry):
+            entry.update({"paths_counted": counted, "paths_calls": 0, "paths_total": 0, "paths_min": paths, "paths_max": paths})
+        entry["paths_calls"] += 1
+        entry["paths_total"] += paths
+        entry["paths_min"] = min(entry["paths_min"], paths)
+        entry["paths_max"] = max(entry["paths_max"], paths)
+    return now
+
+"""
+This method returns a decorator that records every call of the decorated function (e.g. a data loader) as a stage.
+"""
+def profiled(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if(not enabled):
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            recordStage(stage, start)
+            return result
+        return wrapper
+    return decorator
+
+"""
+This method returns a decorator for generator functions (e.g. streaming data loaders) that records the consumption
+of every returned iterator as one call of a stage: the time spent producing its items, recorded when it is exhausted or closed.
+"""
+def profiledIterator(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            iterator = func(*args, **kwargs)
+            if(not enabled):
+                return iterator
+            return iterateProfiled(stage, iterator)
+        return wrapper
+    return decorator
+
+"""
+This method iterates an iterator and records the time spent in it (not in the consumer) as one call of a stage.
+"""
+def iterateProfiled(stage, iterator):
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                seconds += time.perf_counter() - start
+            yield item
+    finally:
+        recordStage(stage, time.perf_counter() - seconds)
+
+"""
+This method merges statistics returned by getProfilingStatistics (e.g. recorded in a worker process) into the recorded statistics.
+"""
+def mergeProfilingStatistics(other):
+    for stage in other:
+        entry = statistics.setdefault(stage, {"calls": 0, "seconds": 0.0})
+        entry["calls"] += other[stage]["calls"]
+        entry["seconds"] += other[stage]["seconds"]
+        if("paths_total" in other[stage]):
+            if("paths_total" not in entry):
+                entry.update({"paths_counted": other[stage]["paths_counted"], "paths_calls": 0, "paths_total": 0,
+                              "paths_min": other[stage]["paths_min"], "paths_max": other[stage]["paths_max"]})
+            entry["paths_calls"] += other[stage]["paths_calls"]
+            entry["paths_total"] += other[stage]["paths_total"]
+            entry["paths_min"] = min(entry["paths_min"], other[stage]["paths_min"])
+            entry["paths_max"] = max(entry["paths_max"], other[stage]["paths_max"])
+
+"""
+This method returns a copy of the recorded statistics as a dict stage -> values,
+including the mean time per call and the mean number of paths per call.
+"""
+def getProfilingStatistics():
+    result = {}
+    for stage in statistics:
+        entry = dict(statistics[stage])
+        entry["seconds_per_call"] = entry["seconds"]/entry["calls"]
+        if("paths_total" in entry):
+            entry["paths_mean"] = entry["paths_total"]/entry["paths_calls"]
+        result[stage] = entry
+    return result
+
+"""
+This method returns the recorded statistics as JSON string, and writes them to file if given.
+"""
+def exportProfilingStatistics(file=None):
+    text = json.dumps(getProfilingStatistics(), indent=1, sort_keys=True)
+    if(file is not None):
+        f = open(file, "w")
+        f.write(text)
+        f.close()
+    return text
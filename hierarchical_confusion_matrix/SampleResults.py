@@ -0,0 +1,254 @@
+# Imports
+import os
+import numpy as np
+from .HierarchicalConfusion import determineEvaluationMeasures
+
+
+
+
+# Record of one sample: running sample number and its hierarchical confusion matrix
+SAMPLE_DTYPE = np.dtype([("id", "<i8"), ("TP", "<i8"), ("TN", "<i8"), ("FP", "<i8"), ("FN", "<i8")])
+# Fixed size of the .npy header, so that the number of rows can be rewritten in place while appending
+HEADER_SIZE = 256
+
+
+
+
+# Methods
+"""
+This method creates the fixed size .npy (version 1.0) header for a file with n rows of SAMPLE_DTYPE.
+"""
+def createHeader(n):
+    header = "{'descr': "+repr(np.lib.format.dtype_to_descr(SAMPLE_DTYPE))+", 'fortran_order': False, 'shape': ("+str(n)+",), }"
+    header = header.ljust(HEADER_SIZE-10-1)+"\n"
+    return b"\x93NUMPY\x01\x00"+np.uint16(len(header)).tobytes()+header.encode("latin1")
+
+"""
+This method reads the header of a per-sample result file written by SampleResultWriter and returns its number of rows.
+Files with another header size or dtype (e.g. written with numpy.save) cannot be continued, a ValueError is raised for them.
+"""
+def readRowCount(f, file):
+    version = np.lib.format.read_magic(f)
+    if(version!=(1, 0)):
+        raise ValueError("File "+file+" has .npy version "+str(version)+", only files of SampleResultWriter can be continued")
+    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    if(f.tell()!=HEADER_SIZE or dtype!=SAMPLE_DTYPE or fortran_order or len(shape)!=1):
+        raise ValueError("File "+file+" was not written by SampleResultWriter (header size or dtype differs) and cannot be continued")
+    f.seek(0, os.SEEK_END)
+    if(f.tell() < HEADER_SIZE+shape[0]*SAMPLE_DTYPE.itemsize):
+        raise ValueError("File "+file+" is shorter than its header says")
+    return shape[0]
+
+"""
+This method cuts the ids file of a per-sample result file back to n_rows lines (lines written after the last row count
+update of an interrupted writer). It raises a ValueError if the file has fewer lines than rows.
+"""
+def truncateIds(file, n_rows):
+    if(not os.path.exists(file+".ids")):
+        raise ValueError("File "+file+" was written without ids and cannot be continued with write_ids")
+    f = open(file+".ids", "r+b")
+    offset = 0
+    n_lines = 0
+    for line in f:
+        if(n_lines==n_rows):
+            break
+        offset += len(line)
+        n_lines += 1
+    if(n_lines < n_rows):
+        f.close()
+        raise ValueError("File "+file+".ids has "+str(n_lines)+" ids for "+str(n_rows)+" rows and cannot be continued")
+    f.truncate(offset)
+    f.close()
+
+"""
+This method converts a sample id to its line in the ids file. Ids with line breaks are rejected with a ValueError,
+as they would shift all later ids.
+"""
+def convertSampleId(key):
+    text = str(key)
+    if("\n" in text or "\r" in text):
+        raise ValueError("Sample id "+repr(text)+" contains a line break and cannot be written to the ids file")
+    return text
+
+"""
+This method memory-maps a per-sample result file written by SampleResultWriter (or any .npy file of SAMPLE_DTYPE rows).
+The result can be sliced like an array, e.g. results["TP"][1000:2000], without loading the whole file.
+"""
+def loadSampleResults(file):
+    return np.load(file, mmap_mode="r")
+
+"""
+This method iterates the original sample ids written next to a per-sample result file, one per row.
+"""
+def iterateSampleIds(file):
+    f = open(file+".ids", "r", encoding="utf8")
+    for line in f:
+        yield line.rstrip("\n")
+    f.close()
+
+"""
+This method sums the hierarchical confusion matrices (TP, TN, FP, FN) of rows start to stop, reading chunk_size rows at a time.
+"""
+def sumSampleResults(results, start=0, stop=None, chunk_size=1000000):
+    if(stop is None):
+        stop = len(results)
+    total = np.zeros(4, dtype=np.int64)
+    for i in range(start, stop, chunk_size):
+        chunk = results[i:min(i+chunk_size, stop)]
+        total += [chunk["TP"].sum(), chunk["TN"].sum(), chunk["FP"].sum(), chunk["FN"].sum()]
+    return total
+
+"""
+This method estimates the distribution of the evaluation measures (F1, PPV, REC, ACC, MCC) with n_boot bootstrap replicates.
+It uses the Poisson bootstrap (every row gets a Poisson(1) weight per replicate). The weights are drawn for blocks of
+replicates and rows of at most memory_budget bytes (numpy draws them as 8 byte integers), and the rows are read in chunks
+of at most memory_budget bytes, so the memory needed is about 2*memory_budget plus 32 bytes per replicate,
+independent of the number of rows.
+It returns a dict measure -> array of n_boot values.
+"""
+def bootstrapEvaluationMeasures(results, n_boot=1000, seed=0, memory_budget=64*2**20):
+    rng = np.random.default_rng(seed)
+    totals = np.zeros((n_boot, 4), dtype=np.int64)
+    max_weights = max(1, memory_budget//8)
+    boot_block = min(n_boot, max_weights)
+    chunk_size = max(1, min(max_weights//boot_block, memory_budget//(SAMPLE_DTYPE.itemsize+32)))
+    for i in range(0, len(results), chunk_size):
+        chunk = results[i:i+chunk_size]
+        values = np.stack([chunk["TP"], chunk["TN"], chunk["FP"], chunk["FN"]], axis=1).astype(np.int64)
+        for b in range(0, n_boot, boot_block):
+            weights = rng.poisson(1.0, size=(min(boot_block, n_boot-b), len(chunk)))
+            totals[b:b+len(weights)] += weights @ values
+    measures = {}
+    for b in range(0, n_boot):
+        for name, value in determineEvaluationMeasures(totals[b]).items():
+            measures.setdefault(name, np.zeros(n_boot))[b] = value
+    return measures
+
+"""
+This method compares two per-sample result files of the same samples chunk by chunk,
+and returns the row numbers at which their hierarchical confusion matrices differ.
+"""
+def diffSampleResults(results_a, results_b, chunk_size=1000000):
+    if(len(results_a)!=len(results_b)):
+        raise ValueError("Results have different numbers of rows: "+str(len(results_a))+" and "+str(len(results_b)))
+    rows = []
+    for i in range(0, len(results_a), chunk_size):
+        a = results_a[i:i+chunk_size]
+        b = results_b[i:i+chunk_size]
+        differs = (a["TP"]!=b["TP"]) | (a["TN"]!=b["TN"]) | (a["FP"]!=b["FP"]) | (a["FN"]!=b["FN"])
+        rows.append(np.nonzero(differs)[0]+i)
+    return np.concatenate(rows) if len(rows)!=0 else np.zeros(0, dtype=np.int64)
+
+
+
+
+# Classes
+"""
+This class writes per-sample results (id, TP, TN, FP, FN) to an appendable .npy file with fixed memory:
+rows are buffered in an array of chunk_size rows and appended to the file when it is full.
+The row count in the header is rewritten with every chunk (after the rows and ids of the chunk are written),
+so the file stays readable (up to the last chunk) if the writer is interrupted.
+An existing file of SampleResultWriter is continued unless overwrite is set, ids written after its last complete chunk are dropped.
+With write_ids, the original sample ids are written to file+".ids", one per line; a file has to be continued with the same write_ids.
+Use it as "with SampleResultWriter(file) as writer:" or call close().
+"""
+class SampleResultWriter:
+    def __init__(self, file, chunk_size=65536, write_ids=True, overwrite=False):
+        self.file = file
+        self.buffer = np.zeros(chunk_size, dtype=SAMPLE_DTYPE)
+        self.buffered = 0
+        self.ids = []
+        self.n_rows = 0
+        if(os.path.exists(file) and not overwrite):
+            self.f = open(file, "r+b")
+            try:
+                self.n_rows = readRowCount(self.f, file)
+                if(write_ids and self.n_rows>0):
+                    truncateIds(file, self.n_rows)
+                elif(not write_ids and os.path.exists(file+".ids")):
+                    raise ValueError("File "+file+" was written with ids and has to be continued with write_ids")
+            except (ValueError, OSError):
+                self.f.close()
+                raise
+            self.f.truncate(HEADER_SIZE+self.n_rows*SAMPLE_DTYPE.itemsize)
+        else:
+            self.f = open(file, "w+b")
+            self.f.write(createHeader(0))
+            if(not write_ids and os.path.exists(file+".ids")):
+                os.remove(file+".ids")
+        self.ids_file = None
+        if(write_ids):
+            self.ids_file = open(file+".ids", "a" if self.n_rows>0 else "w", encoding="utf8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    """
+    This method appends the hierarchical confusion matrix of one sample with its original id (without line breaks).
+    """
+    def append(self, key, confusion_matrix):
+        if(self.ids_file is not None):
+            key = convertSampleId(key)
+        row = self.buffer[self.buffered]
+        row["id"] = self.n_rows+self.buffered
+        row["TP"], row["TN"], row["FP"], row["FN"] = confusion_matrix[0], confusion_matrix[1], confusion_matrix[2], confusion_matrix[3]
+        if(self.ids_file is not None):
+            self.ids.append(key)
+        self.buffered += 1
+        if(self.buffered==len(self.buffer)):
+            self.flush()
+
+    """
+    This method appends the hierarchical confusion matrices (array with one row per sample) of many samples with their ids.
+    All ids are checked before any row is appended.
+    """
+    def appendMany(self, keys, confusion_matrices):
+        confusion_matrices = np.asarray(confusion_matrices, dtype=np.int64).reshape(-1, 4)
+        keys = list(keys)
+        if(self.ids_file is not None):
+            keys = [convertSampleId(key) for key in keys]
+        start = 0
+        while start < len(confusion_matrices):
+            size = min(len(self.buffer)-self.buffered, len(confusion_matrices)-start)
+            rows = self.buffer[self.buffered:self.buffered+size]
+            rows["id"] = np.arange(self.n_rows+self.buffered, self.n_rows+self.buffered+size)
+            for j, name in enumerate(["TP", "TN", "FP", "FN"]):
+                rows[name] = confusion_matrices[start:start+size, j]
+            if(self.ids_file is not None):
+                self.ids.extend(keys[start:start+size])
+            self.buffered += size
+            start += size
+            if(self.buffered==len(self.buffer)):
+                self.flush()
+
+    """
+    This method writes the buffered rows to the file and updates the row count in the header.
+    """
+    def flush(self):
+        if(self.buffered==0):
+            return
+        self.f.seek(HEADER_SIZE+self.n_rows*SAMPLE_DTYPE.itemsize)
+        self.f.write(self.buffer[:self.buffered].tobytes())
+        if(self.ids_file is not None):
+            self.ids_file.write("\n".join(self.ids)+"\n")
+            self.ids_file.flush()
+            self.ids = []
+        self.n_rows += self.buffered
+        self.buffered = 0
+        self.f.seek(0)
+        self.f.write(createHeader(self.n_rows))
+        self.f.flush()
+
+    """
+    This method writes the remaining rows and closes the file.
+    """
+    def close(self):
+        if(self.f.closed):
+            return
+        self.flush()
+        self.f.close()
+        if(self.ids_file is not None):
+            self.ids_file.close()
@@ -0,0 +1,134 @@
+# Imports (matplotlib is only imported when drawing)
+import collections
+import numpy as np
+from .HierarchicalConfusion import generateSortedPredictions, matchPredictionPaths, getShortestPath, getCommonPath
+
+
+
+
+# Methods
+"""
+This method returns the list of edges of a hierarchy (graph or compiled hierarchy) and a dict edge -> position in that list.
+The positions are the indices of the edge weight arrays of aggregatePathEdges.
+"""
+def getEdgeIndex(hierarchy):
+    edges = []
+    for node in list(hierarchy.nodes()):
+        for child in hierarchy.successors(node):
+            edges.append((node, child))
+    return edges, {edge: i for i, edge in enumerate(edges)}
+
+"""
+This method determines the pairs of true path and prediction path that the hierarchical confusion matrix compares (Step 1 to 3,
+with the same matching as determineHierarchicalConfusionMatrix), and the shortest paths of the true labels left without prediction
+(Step 4, paired with None).
+"""
+def determineMatchedPaths(hierarchy, true_labels, pred_labels):
+    pred_labels, w_dj = generateSortedPredictions(hierarchy, true_labels, pred_labels)
+    pairs = matchPredictionPaths(pred_labels, w_dj)
+    for key in w_dj:
+        if(len(w_dj[key])!=0):
+            pairs.append((getShortestPath(w_dj[key]), None))
+    return pairs
+
+"""
+This method adds 1 to the weights of all edges along a path. Edges that are not in the hierarchy are skipped,
+it returns how many were skipped.
+"""
+def addPathEdges(weights, edge_index, path):
+    unknown = 0
+    for i in range(0, len(path)-1):
+        edge = (path[i], path[i+1])
+        if(edge in edge_index):
+            weights[edge_index[edge]] += 1
+        else:
+            unknown += 1
+    return unknown
+
+"""
+This method aggregates the edges of the true, predicted and common paths over a whole evaluation.
+samples is an iterable of (id, true labels, prediction paths), e.g. from the Loaders module.
+It returns a dict with the edge list "edges" and one weight array per kind ("true", "pred", "common"),
+and "errors" (edges on only one of the two paths, i.e. false negatives plus false positives).
+Edges of prediction paths that are not in the hierarchy are not drawn, but counted in "unknown_edges".
+Pass the result as aggregate to continue aggregating further samples.
+"""
+def aggregatePathEdges(hierarchy, samples, aggregate=None):
+    if(aggregate is None):
+        edges, edge_index = getEdgeIndex(hierarchy)
+        aggregate = {"edges": edges, "edge_index": edge_index}
+        for kind in ["true", "pred", "common", "errors"]:
+            aggregate[kind] = np.zeros(len(edges), dtype=np.int64)
+        aggregate["unknown_edges"] = 0
+    edge_index = aggregate["edge_index"]
+    for key, true_labels, pred_labels in samples:
+        for true_path, pred_path in determineMatchedPaths(hierarchy, true_labels, pred_labels):
+            common_path = []
+            if(true_path is not None):
+                addPathEdges(aggregate["true"], edge_index, true_path)
+                if(pred_path is not None):
+                    common_path = getCommonPath(true_path, pred_path)
+                    addPathEdges(aggregate["common"], edge_index, common_path)
+            if(pred_path is not None):
+                aggregate["unknown_edges"] += addPathEdges(aggregate["pred"], edge_index, pred_path)
+    aggregate["errors"] = aggregate["true"] + aggregate["pred"] - 2*aggregate["common"]
+    return aggregate
+
+"""
+This method determines a layered layout for a hierarchy in linear time (suitable for thousands of nodes):
+the y coordinate is minus the shortest depth of a node (breadth first search from "root"),
+x spreads the nodes of each level in depth first order.
+It returns a dict node -> (x, y) like the networkx layouts.
+"""
+def determineLayeredLayout(hierarchy):
+    depth = {"root": 0}
+    queue = collections.deque(["root"])
+    while len(queue)!=0:
+        node = queue.popleft()
+        for child in hierarchy.successors(node):
+            if(child not in depth):
+                depth[child] = depth[node]+1
+                queue.append(child)
+    order = []
+    visited = set(["root"])
+    stack = ["root"]
+    while len(stack)!=0:
+        node = stack.pop()
+        order.append(node)
+        for child in reversed(list(hierarchy.successors(node))):
+            if(child not in visited):
+                visited.add(child)
+                stack.append(child)
+    levels = {}
+    for node in order:
+        levels.setdefault(depth[node], []).append(node)
+    pos = {}
+    for d in levels:
+        for i, node in enumerate(levels[d]):
+            pos[node] = ((i+0.5)/len(levels[d]), -d)
+    return pos
+
+"""
+This method draws the aggregated edge weights of one kind ("errors", "true", "pred" or "common") as heatmap.
+All edges with non-zero weight are drawn in a single batched call (one LineCollection),
+with color and width scaled by the weight. It returns the LineCollection (e.g. for plt.colorbar).
+"""
+def drawEdgeHeatmap(pos, aggregate, kind="errors", ax=None, cmap="Reds", max_width=4.0, draw_nodes=True, node_size=4):
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    if(ax is None):
+        ax = plt.gca()
+    weights = aggregate[kind]
+    selected = np.nonzero(weights)[0]
+    segments = np.asarray([(pos[aggregate["edges"][i][0]], pos[aggregate["edges"][i][1]]) for i in selected]).reshape(-1, 2, 2)
+    values = weights[selected].astype(float)
+    scale = values.max() if len(values)!=0 else 1.0
+    lines = LineCollection(segments, cmap=cmap, linewidths=0.5+(max_width-0.5)*values/scale)
+    lines.set_array(values)
+    if(draw_nodes):
+        xy = np.asarray(list(pos.values()))
+        ax.scatter(xy[:,0], xy[:,1], s=node_size, c="lightgray", zorder=1)
+    ax.add_collection(lines)
+    lines.set_zorder(2)
+    ax.autoscale_view()
+    return lines
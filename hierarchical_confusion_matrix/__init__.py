@@ -1 +1,5 @@
 from .HierarchicalConfusion import *
+from .CompiledHierarchy import CompiledHierarchy, compileHierarchy, loadCompiledHierarchy
+from .Profiling import enableProfiling, disableProfiling, resetProfiling, getProfilingStatistics, exportProfilingStatistics, profiled, profiledIterator
+from .SampleResults import SampleResultWriter, loadSampleResults, iterateSampleIds, sumSampleResults, bootstrapEvaluationMeasures, diffSampleResults
+from .Visualization import aggregatePathEdges, determineMatchedPaths, determineLayeredLayout, drawEdgeHeatmap